@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""Feld-Auswertung ueber archivierte Seitentexte (Analytics, Neu-Ableitung im Archiv-Massstab)
+
+Statt parse_temperature_blocks, extract_vehicle_full und normalize_dt pro Dokument aufzurufen,
+wird ein Chunk von Dokumenten zu einem Text verkettet und jedes Pattern laeuft einmal ueber den
+ganzen Chunk (Leerzeichen-Folgen des Layout-Texts vorher gekuerzt). Datumswerte werden pro
+Spalte normalisiert: jeder eindeutige Wert nur einmal (parse_dt).
+Ergebnis sind Spalten pro Chunk (Arrow-Tabelle, wenn pyarrow installiert ist); der Speicher
+bleibt durch die Chunk-Groesse begrenzt.
+
+Beispiele:
+    python archive.py output/txt_output --out felder.parquet
+    python archive.py --cache --out felder.csv --chunk-size 5000
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from bisect import bisect_right
+
+import processor
+from processor import (
+    TimestampIndex, clean_spaces, extraction_options, filename_fields, fix_encoding, get_cache, get_plan,
+    load_config, parse_dt, parse_temperature_blocks, text_settings, vehicle_from_keywords, _PLATE_DATE_RE, _TEMP_RANGE_RE,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CHUNK_SIZE = 2000
+# Trennt die Dokumente im Chunk-Text; eigene Zeile, damit zeilenweise Patterns nie zwei Dokumente sehen
+DOC_SEP = "\n\x1e\n"
+TIMESTAMP_FIELDS = ("GeplanteLieferung", "GeplantAnkunft", "TatsAnkunft", "BeginnLieferung", "EndeLieferung", "Abfahrt")
+_SPACE_RUN_RE = re.compile(r" {2,}")
+
+# --- BULK-SUCHE UEBER EINEN CHUNK ---
+def search_chunk(pattern, chunk: str, starts: list, ends: list, per_line: bool = False):
+    """(Dokument-Index, Match) wie pattern.finditer pro Dokument bzw. pattern.search pro Zeile (per_line).
+
+    Ein Treffer, der ueber das Dokument- bzw. Zeilenende hinausgeht, wird innerhalb der Grenze
+    neu gesucht - frueher kann dort kein Treffer beginnen, sonst haette die Suche ihn geliefert.
+    """
+    pos, n = 0, len(chunk)
+    while pos <= n:
+        m = pattern.search(chunk, pos)
+        if m is None: return
+        doc = bisect_right(starts, m.start()) - 1
+        if per_line:
+            limit = chunk.find("\n", m.start())
+            if limit < 0: limit = n
+        else:
+            limit = ends[doc]
+        if m.end() > limit or m.start() >= limit:
+            m = pattern.search(chunk, m.start(), limit) if m.start() < limit else None
+            if m is None:
+                pos = max(limit, pos) + 1
+                continue
+        yield doc, m
+        # pro Zeile zaehlt nur der erste Treffer (wie pattern.search(line) in parse_temperature_blocks)
+        pos = limit + 1 if per_line else max(m.end(), m.start() + 1)
+
+def _line_at(chunk: str, start: int, end: int) -> str:
+    return chunk[start:end if end >= 0 else len(chunk)]
+
+def bulk_temperatures(chunk: str, starts: list, ends: list, plan) -> list:
+    """parse_temperature_blocks fuer alle Dokumente eines Chunks (Dokumente ohne Encoding-Probleme)"""
+    out = [[] for _ in starts]
+    deg = "°"
+    for doc, m in search_chunk(plan.temperature, chunk, starts, ends, per_line=True):
+        line_start = chunk.rfind("\n", 0, m.start()) + 1
+        line_end = chunk.find("\n", m.end())
+        chamber, temp = m.group(1).upper(), m.group(2).replace(",", ".")
+        rng = ""
+        range_match = _TEMP_RANGE_RE.search(_line_at(chunk, m.end(), line_end))
+        if range_match: rng = clean_spaces(range_match.group(1))
+        # Nachbarzeilen; am Dokumentrand ist das die Trennzeile, in der nie ein Bereich steht
+        if not rng and line_start > 0:
+            rm = _TEMP_RANGE_RE.search(_line_at(chunk, chunk.rfind("\n", 0, line_start - 1) + 1, line_start - 1))
+            if rm: rng = clean_spaces(rm.group(1))
+        if not rng and line_end >= 0:
+            rm = _TEMP_RANGE_RE.search(_line_at(chunk, line_end + 1, chunk.find("\n", line_end + 1)))
+            if rm: rng = clean_spaces(rm.group(1))
+        out[doc].append({"Kammer": chamber, "Wert": temp + deg + "C", "Range": rng})
+    return out
+
+def bulk_plates(chunk: str, starts: list, ends: list, plan) -> list:
+    """extract_vehicle_full fuer alle Dokumente eines Chunks"""
+    out = [[] for _ in starts]
+    for pattern in plan.plates:
+        for doc, m in search_chunk(pattern, chunk, starts, ends):
+            val = next((g for g in m.groups() if g), None)
+            if val:
+                if _PLATE_DATE_RE.search(val): continue # Datum filtern
+                out[doc].append(clean_spaces(val))
+    return out
+
+def squeezable(plan) -> bool:
+    """Leerzeichen-Folgen vor der Suche auf eines kuerzen (Layout-Text besteht groesstenteils daraus).
+
+    Die Werte laufen ohnehin durch clean_spaces, und \\s nimmt eine Folge immer ganz. Nur zulaessig,
+    wenn kein verwendetes Pattern Leerzeichen woertlich enthaelt.
+    """
+    patterns = [plan.dt_scan, plan.temperature, _TEMP_RANGE_RE, *plan.plates, *plan.vehicle_keywords, *plan.trailer_keywords]
+    if plan.label_scan is not None: patterns.append(plan.label_scan)
+    return not any(" " in p.pattern for p in patterns)
+
+# --- DATUM-NORMALISIERUNG PRO SPALTE ---
+def normalize_dates(values: list, formats: tuple) -> list:
+    """normalize_dt fuer eine ganze Spalte; jeder eindeutige Wert wird nur einmal geparst"""
+    memo = {"": ""}
+    out = []
+    for value in values:
+        norm = memo.get(value)
+        if norm is None: norm = memo[value] = parse_dt(value, formats)[0]
+        out.append(norm)
+    return out
+
+# --- SPALTEN ---
+def columns_for() -> list:
+    codes = processor.CONFIG.get("Temperature", {}).get("ChamberCodes", [])
+    temp_cols = [c for code in codes for c in (f"Temp_{code}", f"TempRange_{code}")]
+    return ["FileName", "Mandant", "Filiale", "Tour", "Fahrzeug", "Anhaenger", *TIMESTAMP_FIELDS, "Temperaturen", *temp_cols]
+
+def parse_fields_batch(texts: list, filenames: list = None, plan=None) -> dict:
+    """Fahrzeug, Zeitstempel und Temperaturen fuer viele Dokumente als Spalten (dict Name -> Liste).
+
+    texts: pro Dokument der Text von Seite 1 oder die Liste der Seitentexte. Die Werte entsprechen
+    den Einzel-Parsern; die Plausibilitaetspruefung gegen Adresse/Fahrer (check_sanity) entfaellt.
+    """
+    plan = plan or get_plan()
+    texts = [t if isinstance(t, str) else (t[0] if t else "") for t in texts]
+    if squeezable(plan): texts = [_SPACE_RUN_RE.sub(" ", t) for t in texts]
+    filenames = filenames or [""] * len(texts)
+    starts, ends, pos = [], [], 0
+    for t in texts:
+        starts.append(pos)
+        pos += len(t)
+        ends.append(pos)
+        pos += len(DOC_SEP)
+    chunk = DOC_SEP.join(texts)
+
+    plates = bulk_plates(chunk, starts, ends, plan)
+    temperatures = bulk_temperatures(chunk, starts, ends, plan)
+    if fix_encoding(chunk) != chunk:
+        # Temperaturzeilen werden vor der Suche repariert: betroffene Dokumente einzeln parsen
+        for i, t in enumerate(texts):
+            if fix_encoding(t) != t: temperatures[i] = parse_temperature_blocks(t)
+
+    # Datums- und Label-Treffer fuer die TimestampIndex-Objekte der Dokumente in einem Durchlauf
+    dt_matches, label_matches = [[] for _ in texts], [[] for _ in texts]
+    for doc, m in search_chunk(plan.dt_scan, chunk, starts, ends): dt_matches[doc].append(m)
+    if plan.label_scan is not None:
+        for doc, m in search_chunk(plan.label_scan, chunk, starts, ends): label_matches[doc].append(m)
+
+    cols = {name: [] for name in columns_for()}
+    raw_times = {field: [] for field in TIMESTAMP_FIELDS}
+    codes = [c[len("Temp_"):] for c in cols if c.startswith("Temp_")]
+    for i, text in enumerate(texts):
+        for key, value in filename_fields(filenames[i]).items(): cols[key].append(value)
+        cols["FileName"].append(filenames[i])
+        vehicle = {"Fahrzeug": plates[i][0] if plates[i] else "", "Anhaenger": plates[i][1] if len(plates[i]) > 1 else ""}
+        if not vehicle["Fahrzeug"] or not vehicle["Anhaenger"]: vehicle_from_keywords(vehicle, text, plan)
+        cols["Fahrzeug"].append(vehicle["Fahrzeug"])
+        cols["Anhaenger"].append(vehicle["Anhaenger"])
+        ts_index = TimestampIndex(chunk, plan, (dt_matches[i], label_matches[i]), starts[i], ends[i])
+        for field in TIMESTAMP_FIELDS: raw_times[field].append(ts_index.raw_after_label(plan.time_labels[field]))
+        temps = temperatures[i]
+        cols["Temperaturen"].append("; ".join(f"{t['Kammer']}: {t['Wert']}" for t in temps))
+        for code in codes:
+            first = next((t for t in temps if t["Kammer"] == code.upper()), None)
+            cols[f"Temp_{code}"].append(_to_float(first["Wert"][:-2]) if first else None)
+            cols[f"TempRange_{code}"].append(first["Range"] if first else "")
+    for field in TIMESTAMP_FIELDS: cols[field] = normalize_dates(raw_times[field], plan.date_formats)
+    return cols
+
+def _to_float(s: str):
+    try: return float(s)
+    except ValueError: return None
+
+def iter_field_chunks(docs, chunk_size: int = CHUNK_SIZE, plan=None):
+    """Spalten pro Chunk aus (Dateiname, Text oder Seitentexte); es liegt immer nur ein Chunk im Speicher"""
+    names, texts = [], []
+    for name, text in docs:
+        names.append(name)
+        texts.append(text)
+        if len(texts) >= chunk_size:
+            yield parse_fields_batch(texts, names, plan)
+            names, texts = [], []
+    if texts: yield parse_fields_batch(texts, names, plan)
+
+def to_table(cols: dict):
+    """Arrow-Tabelle, wenn pyarrow installiert ist, sonst die Spalten selbst"""
+    if pa is None: return cols
+    return pa.table(cols, schema=arrow_schema(list(cols)))
+
+def arrow_schema(names: list):
+    # feste Typen, damit Chunks mit nur leeren Temperaturen dasselbe Schema haben
+    return pa.schema([(n, pa.float64() if n.startswith("Temp_") else pa.string()) for n in names])
+
+# --- QUELLEN ---
+def iter_txt_docs(directory: str):
+    """(Dateiname, Text) aus output/txt_output; die Seiten sind dort nicht getrennt gespeichert"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".txt"): continue
+            with open(os.path.join(root, name), "r", encoding="utf-8", errors="replace") as f:
+                yield os.path.splitext(name)[0] + ".pdf", f.read()
+
+def iter_cache_docs(opts: dict):
+    """(Dateiname, Seitentexte) aus dem Text-Cache, nur Eintraege mit den aktuellen Extraktions-Einstellungen"""
+    settings = text_settings(opts)
+    for entry in get_cache(opts).iter_texts():
+        if entry.get("settings") != settings: continue
+        yield entry.get("filename") or f"{entry['pdf_sha256']}.pdf", entry["pages"]
+
+# --- AUSGABE ---
+class ColumnWriter:
+    """Schreibt Spalten-Chunks nacheinander in eine Parquet- (pyarrow) oder CSV-Datei"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        if self.parquet and pq is None: raise ValueError("Parquet-Ausgabe braucht pyarrow (pip install pyarrow)")
+        self._writer = None
+        self._file = None
+
+    def write(self, cols: dict):
+        if self.parquet:
+            table = to_table(cols)
+            if self._writer is None: self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8-sig", newline="")
+            self._writer = csv.writer(self._file, delimiter=";")
+            self._writer.writerow(cols.keys())
+        self._writer.writerows(zip(*[["" if v is None else v for v in col] for col in cols.values()]))
+
+    def close(self):
+        if self.parquet and self._writer is not None: self._writer.close()
+        if self._file is not None: self._file.close()
+
+def run_archive(docs, out_path: str = None, chunk_size: int = CHUNK_SIZE) -> dict:
+    load_config()
+    plan = get_plan()
+    writer = ColumnWriter(out_path) if out_path else None
+    summary = {"total": 0, "chunks": 0}
+    started = time.monotonic()
+    try:
+        for cols in iter_field_chunks(docs, chunk_size, plan):
+            if writer: writer.write(cols)
+            summary["total"] += len(cols["FileName"])
+            summary["chunks"] += 1
+    finally:
+        if writer: writer.close()
+    wall = time.monotonic() - started
+    summary.update({"wall_seconds": round(wall, 3), "docs_per_sec": round(summary["total"] / wall, 2) if wall > 0 else 0.0,
+                    "out": out_path or "", "config_hash": processor.CONFIG_HASH})
+    print(f"Archiv fertig: {summary['total']} Dokumente in {summary['chunks']} Chunks, {summary['docs_per_sec']} Dok/s"
+          + (f" -> {out_path}" if out_path else ""), file=sys.stderr)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Felder aus archivierten Seitentexten spaltenweise ableiten")
+    parser.add_argument("source", nargs="?", help="Verzeichnis mit Rohtext-Dateien (output/txt_output)")
+    parser.add_argument("--cache", action="store_true", help="Seitentexte aus dem Text-Cache lesen statt aus .txt-Dateien")
+    parser.add_argument("--cache-dir", help="Verzeichnis des Caches")
+    parser.add_argument("--out", help="Ausgabedatei: .parquet (pyarrow) oder .csv")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Dokumente pro Chunk (Standard: {CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+    if not args.cache and not args.source: parser.error("Verzeichnis oder --cache angeben")
+    if args.cache:
+        opts = {"cache": True}
+        if args.cache_dir: opts["cache_dir"] = args.cache_dir
+        docs = iter_cache_docs(extraction_options(opts))
+    else:
+        docs = iter_txt_docs(args.source)
+    try:
+        run_archive(docs, args.out, max(1, args.chunk_size))
+    except ValueError as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
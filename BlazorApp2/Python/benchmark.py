@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Benchmark und Golden-Vergleich fuer processor.py
+
+Misst pdfplumber-Extraktion und Feld-Parser pro Stufe (p50/p95), Durchsatz und Speicher
+und vergleicht die Felder mit gespeicherten Golden-JSONs. So fallen Laufzeit- und
+Genauigkeits-Regressionen (Config-Aenderung, pdfplumber-Update) gemeinsam auf.
+
+Beispiele:
+    python benchmark.py --pdfs samples/ --golden golden/
+    python benchmark.py --pdfs samples/ --golden golden/ --update-golden
+    python benchmark.py --fixtures fixtures/ --synthetic 20 --json bench.json
+    python benchmark.py --pdfs samples/ --baseline bench.json
+    python benchmark.py --pdfs samples/ --compare-engines
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import pdfplumber
+import processor
+from processor import (
+    PARSED_PAGES, ParseContext, extract_page_text, extract_tabular_duration,
+    extract_vehicle_full, extraction_options, get_plan, get_time_after_label, load_config,
+    new_result, parse_temperature_blocks, parse_text, peak_rss_mb, release_page, text_kwargs,
+)
+
+# Felder, die sich bei jedem Lauf aendern und deshalb nicht verglichen werden
+VOLATILE_FIELDS = ("ProcessedAt",)
+
+# Einzelne Parser, die zusaetzlich isoliert gemessen werden (Eingabe: ParseContext)
+PARSER_BENCHMARKS = [
+    ("parse_temperature_blocks", lambda ctx: parse_temperature_blocks(ctx.text1)),
+    ("extract_vehicle_full", lambda ctx: extract_vehicle_full(ctx.text1)),
+    ("get_time_after_label", lambda ctx: [get_time_after_label(ctx.text1, labels) for labels in ctx.plan.time_labels.values()]),
+    ("extract_tabular_duration", lambda ctx: [extract_tabular_duration(ctx.text1, label) for label in ("Lieferzeit", "Standzeit")]),
+]
+
+# Beispiel-POD fuer synthetische Dokumente (Seite 1, Seite 2)
+SYNTHETIC_PAGES = [
+    "\n".join([
+        "Depot Musterstadt Nord",
+        "Fahrzeug: ABC123 (WI-AB 1234)   Anhänger: WI-XY 567",
+        "Fahrer", "Max Mustermann",
+        "Adresse", "Hauptstrasse 12, 65183 Wiesbaden Innenstadt",
+        "Geplante Lieferung 12.03.24, 08:00",
+        "Geplant Ankunft  12.03.24, 07:45   Tats. Ankunft 12.03.24, 07:52",
+        "Beginn Lieferung 12.03.24, 08:01   Ende Lieferung 12.03.24, 08:31",
+        "Abfahrt 12.03.24, 08:40",
+        "Lieferzeit  Standzeit", "12.03.24, 08:31 00:30",
+        "Pünktlich (00:07)",
+        "FR 3,5 °C   2-7 °C", "TK -19,2 °C  -25 - -18 °C",
+        "123456789 12 100 100 100,0 0 1.234 56,78",
+        "{noise}",
+        "Gesamt 12 100 100 100,0 0 1.234 56,78",
+        "Annahmebereitschaft", "Ware angenommen ohne Mangel",
+        "Kommentar", "Haftungsausschluss Keine Beanstandung", "",
+        "Der Filialleiter bestaetigt Unterschrift", "Filialleiter",
+        "Erika Beispiel 12.03.24", "12.03.24, 08:45",
+    ]),
+    "\n".join([
+        "Leergut", "Geplante Abholung",
+        "1001 Euro Palette 5 10 10 2 8 2",
+        "1002 Kiste blau -- 4 4 0 4 0",
+        "Zusammenfassung 14 14 2 12 2",
+    ]),
+]
+
+def synthetic_documents(count: int):
+    """count Dokumente mit wachsender Anzahl an Fuelltext-Zeilen (prueft Skalierung mit der Zeilenzahl)"""
+    for i in range(count):
+        noise = "\n".join(f"{100000000 + j} Artikel {j} Lorem ipsum {j % 7},{j % 10}" for j in range(i * 25))
+        yield f"synthetic_{i:03d}", [SYNTHETIC_PAGES[0].replace("{noise}", noise), SYNTHETIC_PAGES[1]]
+
+def load_fixture(path: str) -> list:
+    """Text-Fixture: Seiten durch Form-Feed (\\f) getrennt, wie in pdftotext"""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().split("\f")
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+class StageTimer:
+    """Sammelt Messwerte pro Stufe"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def report(self) -> dict:
+        return {
+            stage: {
+                "n": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+                "total_ms": round(sum(values) * 1000, 3),
+            }
+            for stage, values in sorted(self.samples.items())
+        }
+
+def bench_parse(name: str, pages_text: list, timer: StageTimer) -> dict:
+    """Feld-Parsing eines Dokuments mit Zeiten pro Stufe und pro Einzel-Parser"""
+    plan = get_plan()
+    data = new_result(f"{name}.pdf")
+    timings = {}
+    started = time.perf_counter()
+    if any(t.strip() for t in pages_text):
+        processor.parse_pages(data, pages_text, plan, timings)
+    else:
+        parse_text(data, pages_text, None, plan)
+    timer.add("parse.total", time.perf_counter() - started)
+    for stage, seconds in timings.items(): timer.add(f"parse.{stage}", seconds)
+
+    ctx = ParseContext(pages_text, plan)
+    for parser_name, fn in PARSER_BENCHMARKS:
+        started = time.perf_counter()
+        fn(ctx)
+        timer.add(f"parser.{parser_name}", time.perf_counter() - started)
+    return data
+
+def bench_pdf(path: str, timer: StageTimer, opts: dict) -> list:
+    """pdfplumber-Teil: Oeffnen und Layout-Extraktion der vom Parser gelesenen Seiten"""
+    started = time.perf_counter()
+    with pdfplumber.open(path) as pdf:
+        timer.add("pdf.open", time.perf_counter() - started)
+        pages_text = []
+        for page in pdf.pages[:PARSED_PAGES]:
+            t0 = time.perf_counter()
+            pages_text.append(extract_page_text(page, **text_kwargs(opts)))
+            timer.add("pdf.extract_page", time.perf_counter() - t0)
+            release_page(page)
+    return pages_text
+
+def flatten(value, prefix: str = "") -> dict:
+    """Verschachtelte Ergebnisse als {"StoppInfos.Abfahrt": ..., "Waren[0].AnzArtikel": ...}"""
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items(): out.update(flatten(v, f"{prefix}.{k}" if prefix else k))
+        return out
+    if isinstance(value, list):
+        out = {f"{prefix}.len": len(value)}
+        for i, v in enumerate(value): out.update(flatten(v, f"{prefix}[{i}]"))
+        return out
+    return {prefix: value}
+
+def comparable_fields(data: dict) -> dict:
+    return flatten({k: v for k, v in data.items() if k not in VOLATILE_FIELDS and not k.startswith("_")})
+
+def compare_golden(data: dict, golden: dict) -> list:
+    """Liste der abweichenden Felder als (Feld, erwartet, aktuell)"""
+    expected, actual = comparable_fields(golden), comparable_fields(data)
+    return [(k, expected.get(k), actual.get(k)) for k in sorted(set(expected) | set(actual)) if expected.get(k) != actual.get(k)]
+
+ENGINES = ("layout", "lines")
+
+def compare_engines(pdf_dir: str, opts: dict, repeat: int = 3) -> dict:
+    """Extraktion mit beiden Engines: Feld-Uebereinstimmung von "lines" gegenueber "layout" und Speedup.
+
+    Gemessen wird Oeffnen + Extraktion der geparsten Seiten, jeweils die schnellste von repeat Runden.
+    """
+    plan = get_plan()
+    docs, totals = [], dict.fromkeys(ENGINES, 0.0)
+    for name in sorted(os.listdir(pdf_dir)):
+        if not name.lower().endswith(".pdf"): continue
+        results, seconds = {}, {}
+        for engine in ENGINES:
+            settings = text_kwargs(dict(opts, engine=engine))
+            for _ in range(repeat):
+                started = time.perf_counter()
+                with pdfplumber.open(os.path.join(pdf_dir, name)) as pdf:
+                    pages_text = [extract_page_text(page, **settings) for page in pdf.pages[:PARSED_PAGES]]
+                seconds[engine] = min(seconds.get(engine, float("inf")), time.perf_counter() - started)
+            totals[engine] += seconds[engine]
+            results[engine] = new_result(name)
+            parse_text(results[engine], pages_text, None, plan)
+        diffs = compare_golden(results["lines"], results["layout"])
+        n_fields = len(set(comparable_fields(results["layout"])) | set(comparable_fields(results["lines"])))
+        docs.append({
+            "name": name, "layout_ms": round(seconds["layout"] * 1000, 1), "lines_ms": round(seconds["lines"] * 1000, 1),
+            "agreement": round(1 - len(diffs) / n_fields, 4) if n_fields else 1.0,
+            "diffs": [{"field": k, "layout": e, "lines": a} for k, e, a in diffs],
+        })
+    return {
+        "documents": len(docs),
+        "identical_documents": sum(1 for d in docs if not d["diffs"]),
+        "mean_agreement": round(sum(d["agreement"] for d in docs) / len(docs), 4) if docs else None,
+        "speedup": round(totals["layout"] / totals["lines"], 2) if totals["lines"] else None,
+        "docs": docs,
+    }
+
+def print_engine_comparison(report: dict):
+    print(f"{report['documents']} Dokumente, {report['identical_documents']} identisch, "
+          f"Feld-Uebereinstimmung {report['mean_agreement']}, Speedup lines/layout {report['speedup']}x")
+    for d in report["docs"]:
+        print(f"{d['name']:<40}{d['layout_ms']:>10.1f} ms{d['lines_ms']:>10.1f} ms  {d['agreement']:.2%}")
+        for diff in d["diffs"][:10]: print(f"  {diff['field']}: layout {diff['layout']!r}, lines {diff['lines']!r}")
+
+def collect_inputs(args):
+    """(Name, Art, Quelle) fuer PDFs, Text-Fixtures und synthetische Dokumente"""
+    inputs = []
+    if args.pdfs:
+        for name in sorted(os.listdir(args.pdfs)):
+            if name.lower().endswith(".pdf"): inputs.append((os.path.splitext(name)[0], "pdf", os.path.join(args.pdfs, name)))
+    if args.fixtures:
+        for name in sorted(os.listdir(args.fixtures)):
+            if name.lower().endswith(".txt"): inputs.append((os.path.splitext(name)[0], "text", load_fixture(os.path.join(args.fixtures, name))))
+    for name, pages in synthetic_documents(args.synthetic):
+        inputs.append((name, "text", pages))
+    return inputs
+
+def run(args) -> int:
+    load_config()
+    opts = extraction_options({"engine": args.engine})
+    if args.compare_engines:
+        if not args.pdfs:
+            print("--compare-engines braucht --pdfs", file=sys.stderr)
+            return 2
+        report = compare_engines(args.pdfs, opts, max(3, args.repeat))
+        print_engine_comparison(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        return 0
+    timer = StageTimer()
+    inputs = collect_inputs(args)
+    if not inputs:
+        print("Keine Eingaben: --pdfs, --fixtures oder --synthetic angeben", file=sys.stderr)
+        return 2
+
+    results, golden_diffs = {}, {}
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for name, kind, source in inputs:
+            t0 = time.perf_counter()
+            pages_text = bench_pdf(source, timer, opts) if kind == "pdf" else source
+            results[name] = bench_parse(name, pages_text, timer)
+            timer.add(f"document.{kind}", time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+    docs = len(inputs) * args.repeat
+
+    if args.golden:
+        os.makedirs(args.golden, exist_ok=True)
+        for name, data in results.items():
+            golden_path = os.path.join(args.golden, f"{name}.json")
+            if args.update_golden:
+                with open(golden_path, "w", encoding="utf-8") as f:
+                    json.dump({k: v for k, v in data.items() if k not in VOLATILE_FIELDS}, f, ensure_ascii=False, indent=2)
+            elif os.path.exists(golden_path):
+                with open(golden_path, "r", encoding="utf-8") as f:
+                    diffs = compare_golden(data, json.load(f))
+                if diffs: golden_diffs[name] = [{"field": k, "expected": e, "actual": a} for k, e, a in diffs]
+
+    report = {
+        "documents": docs, "wall_seconds": round(wall, 3), "docs_per_sec": round(docs / wall, 2) if wall > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(), "config_hash": processor.CONFIG_HASH, "pdfplumber": pdfplumber.__version__,
+        "stages": timer.report(), "golden_mismatches": golden_diffs,
+    }
+    report["regressions"] = find_regressions(report, args.baseline, args.tolerance) if args.baseline else []
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if golden_diffs or report["regressions"] else 0
+
+def find_regressions(report: dict, baseline_path: str, tolerance: float) -> list:
+    """Stufen, deren p50 mehr als tolerance ueber der Baseline liegt (Rauschgrenze 0,05 ms)"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("stages", {})
+    out = []
+    for stage, cur in report["stages"].items():
+        base = baseline.get(stage)
+        if base and cur["p50_ms"] > base["p50_ms"] * (1 + tolerance) and cur["p50_ms"] - base["p50_ms"] > 0.05:
+            out.append({"stage": stage, "baseline_p50_ms": base["p50_ms"], "p50_ms": cur["p50_ms"]})
+    return out
+
+def print_report(report: dict):
+    print(f"{report['documents']} Dokumente in {report['wall_seconds']} s = {report['docs_per_sec']} Dok/s, "
+          f"Peak-RSS {report['peak_rss_mb']} MB, pdfplumber {report['pdfplumber']}")
+    print(f"{'Stufe':<36}{'n':>6}{'p50 ms':>12}{'p95 ms':>12}{'Summe ms':>12}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<36}{s['n']:>6}{s['p50_ms']:>12.3f}{s['p95_ms']:>12.3f}{s['total_ms']:>12.1f}")
+    for name, diffs in report["golden_mismatches"].items():
+        print(f"GOLDEN {name}: {len(diffs)} Abweichung(en)")
+        for d in diffs[:20]: print(f"  {d['field']}: erwartet {d['expected']!r}, aktuell {d['actual']!r}")
+    for r in report["regressions"]:
+        print(f"LANGSAMER {r['stage']}: p50 {r['baseline_p50_ms']} ms -> {r['p50_ms']} ms")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark und Golden-Vergleich fuer processor.py")
+    parser.add_argument("--pdfs", help="Verzeichnis mit Beispiel-PDFs")
+    parser.add_argument("--fixtures", help="Verzeichnis mit Text-Fixtures (*.txt, Seiten durch \\f getrennt)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Anzahl synthetischer Dokumente")
+    parser.add_argument("--repeat", type=int, default=1, help="Durchlaeufe pro Eingabe")
+    parser.add_argument("--golden", help="Verzeichnis mit Golden-JSONs (<name>.json)")
+    parser.add_argument("--update-golden", action="store_true", help="Golden-JSONs aus den aktuellen Ergebnissen schreiben")
+    parser.add_argument("--baseline", help="Frueherer Report (--json) fuer den Laufzeit-Vergleich")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte Verlangsamung gegenueber der Baseline (0.25 = 25%%)")
+    parser.add_argument("--json", help="Report als JSON speichern")
+    parser.add_argument("--engine", choices=ENGINES, help="Text-Engine fuer die PDF-Messung (Standard: layout)")
+    parser.add_argument("--compare-engines", action="store_true", help="layout und lines auf --pdfs vergleichen (Felder, Laufzeit)")
+    return run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    processor.configure_stdio()
+    sys.exit(main())
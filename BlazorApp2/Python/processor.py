@@ -6,12 +6,44 @@ import json
 import os
 import re
 import csv
+import sqlite3
+import argparse
+import hashlib
+import time
+import signal
+import atexit
+import queue
+import threading
+import cProfile
+import pstats
+import multiprocessing
+import asyncio
+from multiprocessing.connection import wait as wait_connections
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 import pdfplumber
 
-# Setze stdout auf UTF-8 für korrekte Ausgabe von Umlauten
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+try:
+    import resource # nur Unix, fuer Peak-RSS in _metrics
+except ImportError:
+    resource = None
+try:
+    import fcntl # Sperre fuer Sammeldateien (Unix)
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt # Sperre fuer Sammeldateien (Windows)
+except ImportError:
+    msvcrt = None
+
+def configure_stdio():
+    """Setzt stdout/stderr auf UTF-8 für korrekte Ausgabe von Umlauten (einmal pro Prozess)"""
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 # --- KONFIGURATION LADEN ---
 # Priorisierung: 1. Umgebungsvariable 2. Neben dem Skript 3. Im Config-Ordner des App-Verzeichnisses
@@ -37,17 +69,200 @@ def get_config_path():
 
 CONFIG_FILE = get_config_path()
 CONFIG = {}
+CONFIG_HASH = "" # Hash der kanonischen Config (unabhaengig von Formatierung)
+_CONFIG_MTIME = None
+_CONFIG_SIZE = None
+_CONFIG_RAW_HASH = ""
+_CONFIG_CHECKED = 0.0
+CONFIG_CHECK_INTERVAL = 2.0 # Sekunden; Aenderungen (z.B. aus der OcrConfig-Seite) greifen spaetestens danach
 
-def load_config():
-    global CONFIG
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            CONFIG = json.load(f)
-    else:
+def read_config(force: bool = False):
+    """Liest die Config nur neu ein, wenn sich die Datei seit dem letzten Laden geaendert hat.
+
+    mtime und Groesse werden hoechstens alle CONFIG_CHECK_INTERVAL Sekunden geprueft (force: sofort),
+    damit ein langlaufender Prozess nicht pro Dokument auf die Datei zugreift. Uebernommen wird
+    eine neue Datei erst, wenn sie sich parsen und der Plan sich bauen laesst; bis dahin bleibt
+    die alte Config aktiv und die naechste Pruefung liest erneut.
+    """
+    global CONFIG, CONFIG_HASH, _CONFIG_MTIME, _CONFIG_SIZE, _CONFIG_RAW_HASH, _CONFIG_CHECKED, _PLAN
+    now = time.monotonic()
+    if CONFIG and not force and now - _CONFIG_CHECKED < CONFIG_CHECK_INTERVAL:
+        return False
+    _CONFIG_CHECKED = now
+    if not os.path.exists(CONFIG_FILE):
+        raise FileNotFoundError(f"Config file not found at {CONFIG_FILE}")
+    stat = os.stat(CONFIG_FILE)
+    if CONFIG and (stat.st_mtime, stat.st_size) == (_CONFIG_MTIME, _CONFIG_SIZE):
+        return False
+    with open(CONFIG_FILE, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if CONFIG and digest == _CONFIG_RAW_HASH:
+        _CONFIG_MTIME, _CONFIG_SIZE = stat.st_mtime, len(raw)
+        return False # nur mtime geaendert (z.B. erneut gespeichert), Inhalt identisch
+    try:
+        config = json.loads(raw.decode('utf-8-sig'))
+        config_hash = hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        plan = ExtractionPlan(config, config_hash, _PLAN)
+    except (ValueError, KeyError, TypeError, re.error) as e:
+        # z.B. Datei von der OcrConfig-Seite gerade halb geschrieben oder ein Abschnitt ohne Pflicht-Eintrag
+        message = f"fehlender Eintrag {e}" if isinstance(e, KeyError) else str(e)
+        if not CONFIG: raise ValueError(f"Config ungueltig ({CONFIG_FILE}): {message}") from e
+        print(f"Config nicht uebernommen ({message}), weiter mit {CONFIG_HASH[:12]}", file=sys.stderr)
+        return False
+    if _PLAN is not None:
+        print(f"Config neu geladen ({config_hash[:12]}), neu gebaut: {', '.join(plan.rebuilt) or '-'}", file=sys.stderr)
+    CONFIG, CONFIG_HASH, _PLAN = config, config_hash, plan
+    _CONFIG_MTIME, _CONFIG_SIZE, _CONFIG_RAW_HASH = stat.st_mtime, len(raw), digest
+    return True
+
+def config_info() -> dict:
+    """Abschnitt _config im Ergebnis: mit welcher Config-Version extrahiert wurde"""
+    modified = datetime.fromtimestamp(_CONFIG_MTIME).astimezone().isoformat(timespec="seconds") if _CONFIG_MTIME else ""
+    return {"hash": CONFIG_HASH, "modified": modified}
+
+def load_config(force: bool = False):
+    try:
+        read_config(force)
+    except (FileNotFoundError, ValueError) as e:
         # Fallback oder Fehler, falls Config fehlt
-        print(json.dumps({"Error": f"Config file not found at {CONFIG_FILE}"}))
+        print(json.dumps({"Error": str(e)}))
         sys.exit(1)
 
+# --- EXTRAKTIONSPLAN ---
+# Alle Patterns aus der Config werden einmal kompiliert und erst bei geaendertem Config-Hash neu gebaut.
+# Keyword-Listen, die nur als "kommt eines davon vor?" geprueft werden, sind zu einer Alternation zusammengefasst.
+# Listen mit Prioritaet (erstes Keyword gewinnt) bleiben als Liste in Config-Reihenfolge.
+def keyword_alternation(keywords: list, flags: int = re.IGNORECASE):
+    return re.compile(r"\b(?:" + "|".join(f"(?:{kw})" for kw in keywords) + r")\b", flags)
+
+class ExtractionPlan:
+    """Vorkompilierte Regex-Patterns fuer eine Config-Version.
+
+    Der Plan besteht aus Teilen pro Config-Abschnitt (PARTS). Mit previous (Plan der vorigen
+    Config) werden nur die Teile neu gebaut, deren Abschnitte sich geaendert haben.
+    """
+
+    # Teil -> Config-Abschnitte, aus denen er gebaut wird
+    PARTS = {
+        "general": ("General",), "vehicle": ("Vehicle",), "driver": ("Driver",), "address": ("Address",),
+        "timestamps": ("General", "Timestamps"), "temperature": ("Temperature",), "goods": ("Goods",),
+        "empties": ("Empties",), "conclusion": ("Conclusion",),
+    }
+
+    def __init__(self, config: dict, config_hash: str = "", previous: "ExtractionPlan" = None):
+        self.config_hash = config_hash
+        self._words = previous._words if previous else {} # haengt nicht von der Config ab
+        self._parts, self.part_hashes, self.rebuilt = {}, {}, []
+        for name, sections in self.PARTS.items():
+            digest = hashlib.sha256(json.dumps([config.get(s) for s in sections], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+            if previous is not None and previous.part_hashes.get(name) == digest:
+                attrs = previous._parts[name]
+                self.__dict__.update(attrs)
+            else:
+                before = set(self.__dict__)
+                getattr(self, f"_build_{name}")(config)
+                # Attribute des Teils merken, damit der naechste Plan sie uebernehmen kann
+                attrs = {k: self.__dict__[k] for k in self.__dict__.keys() - before}
+                self.rebuilt.append(name)
+            self._parts[name] = attrs
+            self.part_hashes[name] = digest
+
+    def _build_general(self, config: dict):
+        general = config["General"]
+        self.dt_pat = general["DateTimePattern"]
+        self.date_formats = tuple(general.get("DateFormatList", ["%d.%m.%y, %H:%M"])) # Schluessel fuer parse_dt
+        self.dt_any = re.compile(self.dt_pat)
+        self.dt_duration = re.compile(rf"{self.dt_pat}\s+(\d{{2}}:\d{{2}})")
+        self.zip_code = re.compile(general["ZipCodePattern"])
+
+    def _build_vehicle(self, config: dict):
+        vehicle = config["Vehicle"]
+        self.plates = [re.compile(p) for p in vehicle["PlatePatterns"]]
+        self.vehicle_keywords = [re.compile(rf"{kw}\s*:?[\s\n]+(.+)") for kw in vehicle["Keywords"]]
+        self.trailer_keywords = [re.compile(rf"{kw}\s*:?[\s\n]+(.+)") for kw in vehicle["TrailerKeywords"]]
+
+    def _build_driver(self, config: dict):
+        driver = config["Driver"]
+        self.driver_keyword = keyword_alternation(driver["Keywords"])
+        self.driver_ignore = [x.upper() for x in driver["IgnoreList"]]
+        self.driver_name = re.compile(driver["NamePattern"])
+
+    def _build_address(self, config: dict):
+        address = config["Address"]
+        self.address_keyword = keyword_alternation(address["Keywords"])
+        self.main_note = re.compile(address["MainNotePattern"], re.IGNORECASE)
+
+    def _build_timestamps(self, config: dict):
+        timestamps = config["Timestamps"]
+        self.time_labels = timestamps["Labels"]
+        self._time_labels = {} # haengt vom DateTimePattern ab
+        # Alle Labels in einer Alternation: ein Durchlauf liefert die Positionen aller Label-Treffer
+        labels = list(dict.fromkeys(l for ls in self.time_labels.values() for l in ls))
+        self.label_names = {f"L{i}": l for i, l in enumerate(labels)}
+        self.known_labels = set(labels)
+        self.label_scan = re.compile("(?is)" + "|".join(f"(?P<{n}>(?:{l}))" for n, l in self.label_names.items())) if labels else None
+        self.dt_scan = re.compile(rf"(?is)({self.dt_pat})")
+        self.punctuality = [re.compile(p, re.IGNORECASE) for p in timestamps["PunctualityPatterns"]]
+
+    def _build_temperature(self, config: dict):
+        self.temperature = re.compile(config["Temperature"]["RegexPattern"], re.IGNORECASE)
+
+    def _build_goods(self, config: dict):
+        self.goods_row = re.compile(config["Goods"]["TablePattern"])
+        self.goods_total = re.compile(config["Goods"]["TotalPattern"])
+
+    def _build_empties(self, config: dict):
+        self.empties_collection = re.compile(config["Empties"]["CollectionPattern"], re.IGNORECASE)
+        self.empties_summary = re.compile(config["Empties"]["SummaryPattern"])
+
+    def _build_conclusion(self, config: dict):
+        conclusion = config["Conclusion"]
+        sig_kw = conclusion["SignatureKeywords"]
+        self.signature_confirm = re.compile(rf"(?is)Der\s+({'|'.join(sig_kw)}).*?Unterschrift")
+        # Bleibt eine Liste: gesucht wird das Ende des letzten Treffers ueber alle Keywords (auch ueberlappend)
+        self.signature_keywords = [re.compile(rf"(?is){skw}") for skw in sig_kw]
+        self.signature_ignore = conclusion["IgnoreSignatureContent"]
+
+    def time_label(self, label: str):
+        """Label + beliebiger Text + DatumPattern, pro Label nur einmal kompiliert"""
+        rx = self._time_labels.get(label)
+        if rx is None:
+            rx = self._time_labels[label] = re.compile(rf"(?is){label}.*?({self.dt_pat})")
+        return rx
+
+    def word(self, label: str):
+        rx = self._words.get(label)
+        if rx is None:
+            rx = self._words[label] = re.compile(rf"\b{label}\b", re.IGNORECASE)
+        return rx
+
+_PLAN = None
+
+def get_plan() -> ExtractionPlan:
+    """Liefert den Plan zur aktuell geladenen Config (wird in read_config mitgebaut)"""
+    global _PLAN
+    if not CONFIG: load_config()
+    if _PLAN is None or _PLAN.config_hash != CONFIG_HASH:
+        _PLAN = ExtractionPlan(CONFIG, CONFIG_HASH, _PLAN)
+    return _PLAN
+
+# Feste (nicht konfigurierbare) Patterns
+_MULTI_SPACE_RE = re.compile(r"\s{2,}")
+_NON_NUMERIC_RE = re.compile(r"[^0-9,-]")
+_TEMP_RANGE_RE = re.compile(r"([0-9.,-]+\s*-\s*[0-9.,-]+\s*°?\s*C)")
+_DURATION_RE = re.compile(r"\b(\d{2}:\d{2})\b")
+_PLATE_DATE_RE = re.compile(r"\d{4}-\d{2}")
+_TRAILING_ZIP_RE = re.compile(r"\d{4,5}\s*$")
+_STREET_RE = re.compile(r"\b(Str\.|Strasse|Straße|Weg|Platz|Gasse)\b", re.IGNORECASE)
+_ANNAHME_RE = re.compile(r"(?is)Annahmebereitschaft([\s\S]*?)(?:Geliefert\s+an|Kommentar|Haftungsausschluss)")
+_KOMMENTAR_RE = re.compile(r"(?is)Haftungsausschluss\s+(.*?)(?:\n\s*\n|[a-z]{3,}\s*\d{2}\.\d{2}\.\d{2})")
+_LEERGUT_ROW_RE = re.compile(r"^\s*(\d{4})\s+(.*?)\s+(--|-?\d+)\s+(.*)")
+_INT_RE = re.compile(r"(-?\d+)")
+_SHORT_DATE_RE = re.compile(r"\d{2}\.\d{2}\.\d{2}")
+_SHORT_DATE_TAIL_RE = re.compile(r"\d{2}\.\d{2}\.\d{2}.*")
+_NAME_ONLY_RE = re.compile(r"^[A-Za-zÄÖÜäöüß\s]+$")
+
 # Output-Ordner - relativ zum Skript-Verzeichnis oder Temp
 def get_output_dirs():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -94,57 +309,524 @@ def fix_encoding(s: str) -> str:
 
 def clean_spaces(text: str) -> str:
     text = fix_encoding(text or "")
-    return re.sub(r"\s{2,}", " ", text).strip()
+    return _MULTI_SPACE_RE.sub(" ", text).strip()
 
 def clean_int(val) -> int:
     if val is None: return 0
     s = fix_encoding(str(val)).strip()
     if not s: return 0
     s = s.replace(" ", "").replace(".", "")
-    s = re.sub(r"[^0-9,-]", "", s).replace(",", ".")
+    s = _NON_NUMERIC_RE.sub("", s).replace(",", ".")
     try: return int(float(s))
     except: return 0
 
+# --- DATUM (General.DateFormatList) ---
+DT_OUTPUT_FORMAT = "%Y/%m/%d, %H:%M"
+DT_CACHE_SIZE = 4096 # eindeutige Rohwerte; pro Tag wiederholen sich wenige hundert
+_LAST_FORMAT = {} # Formatliste -> zuletzt passendes Format
+
+def _strptime(s: str, fmt: str):
+    try: return datetime.strptime(s, fmt)
+    except ValueError: return None
+
+@lru_cache(maxsize=DT_CACHE_SIZE)
+def parse_dt(raw: str, formats: tuple) -> tuple:
+    """Rohwert -> (normalisierter String, datetime oder None), gecacht pro (Rohwert, Formatliste).
+
+    Das zuletzt passende Format wird zuerst versucht. Ergebnis ist identisch zur Reihenfolge der
+    Liste, solange kein Rohwert auf zwei Formate passt (bei der aktuellen Config nie der Fall).
+    """
+    s = clean_spaces(raw)
+    if not s: return "", None
+    last = _LAST_FORMAT.get(formats)
+    for fmt in (formats if last is None else (last, *(f for f in formats if f != last))):
+        dt = _strptime(s, fmt)
+        if dt is not None:
+            _LAST_FORMAT[formats] = fmt
+            # Sekunden fehlen im normalisierten String - Dauern wie bisher ohne sie rechnen
+            return dt.strftime(DT_OUTPUT_FORMAT), dt.replace(second=0, microsecond=0)
+    return s, _strptime(s, DT_OUTPUT_FORMAT) # Wert bleibt stehen; Dauer wie dt_from_norm
+
+def date_formats() -> tuple:
+    return get_plan().date_formats if CONFIG else ("%d.%m.%y, %H:%M",)
+
 def normalize_dt(s: str) -> str:
-    s = clean_spaces(s)
-    if not s: return ""
-    formats = CONFIG.get("General", {}).get("DateFormatList", ["%d.%m.%y, %H:%M"])
-    for fmt in formats:
-        try: return datetime.strptime(s, fmt).strftime("%Y/%m/%d, %H:%M")
-        except: pass
-    return s
+    return parse_dt(s or "", date_formats())[0]
 
 def dt_from_norm(s: str):
     s = (s or "").strip()
     if not s or s == "--": return None
-    try: return datetime.strptime(s, "%Y/%m/%d, %H:%M")
-    except: return None
+    return parse_dt(s, (DT_OUTPUT_FORMAT,))[1]
 
 def hhmm_delta(a: str, b: str) -> str:
-    da, db = dt_from_norm(a), dt_from_norm(b)
+    return hhmm_between(dt_from_norm(a), dt_from_norm(b))
+
+def hhmm_between(da: datetime, db: datetime) -> str:
+    """Dauer hh:mm von da nach db (ueber Mitternacht; mehr als 12 Stunden gilt als 00:00)"""
     if not da or not db: return ""
     mins = int((db - da).total_seconds() // 60)
     if mins < 0: mins += 24 * 60
     if mins > 12 * 60: return "00:00"
     return f"{mins//60:02d}:{mins%60:02d}"
 
-def extract_page_text(page) -> str:
-    t = page.extract_text(layout=True, x_tolerance=3) or ""
+# Punkte pro Zeichenspalte bzw. Textzeile, wie pdfplumber im Layout-Modus (x_density, y_density)
+LAYOUT_X_DENSITY = 7.25
+LAYOUT_Y_DENSITY = 13
+
+def extract_page_lines(page, x_tolerance: float = 3, y_tolerance: float = 3) -> str:
+    """Engine "lines": Zeilen direkt aus page.chars, gruppiert nach gerundetem top.
+
+    Spart die Layout-Rekonstruktion (Zeichenraster ueber die ganze Seite). Luecken innerhalb einer
+    Zeile werden wie im Layout-Modus mit gap / LAYOUT_X_DENSITY Leerzeichen aufgefuellt, damit
+    Tabellenspalten (Waren, Leergut, Liefer-/Standzeit) getrennt bleiben. Groessere vertikale Abstaende
+    ergeben Leerzeilen (Abschnittsgrenzen, z.B. fuer den Kommentar); nur die Einrueckung entfaellt.
+    Leerzeichen-Zeichen trennen immer Woerter, auch wenn sie (kleine Schrift) schmaler als x_tolerance sind.
+    """
+    rows, blanks = {}, []
+    for ch in page.chars:
+        if ch["text"].strip(): rows.setdefault(round(ch["top"]), []).append(ch)
+        else: blanks.append(ch)
+    lines, current, current_top, line_of = [], [], None, {}
+    for top in sorted(rows):
+        if current and top - current_top > y_tolerance:
+            lines.append((current_top, current))
+            current = []
+        if not current: current_top = top
+        current.extend(rows[top])
+        line_of[top] = len(lines)
+    if current: lines.append((current_top, current))
+    for ch in blanks: # nur Leerzeichen auf Zeilen mit sichtbaren Zeichen zaehlen
+        idx = line_of.get(round(ch["top"]))
+        if idx is not None: lines[idx][1].append(ch)
+
+    out, prev_top = [], None
+    for top, chars in lines:
+        if prev_top is not None: out.extend([""] * max(0, round((top - prev_top) / LAYOUT_Y_DENSITY) - 1))
+        prev_top = top
+        chars.sort(key=lambda c: c["x0"])
+        parts, prev_x1, blank = [], None, False
+        for ch in chars:
+            if not ch["text"].strip():
+                blank = prev_x1 is not None
+                continue
+            if prev_x1 is not None and (blank or ch["x0"] - prev_x1 > x_tolerance):
+                parts.append(" " * max(1, round((ch["x0"] - prev_x1) / LAYOUT_X_DENSITY)))
+            parts.append(ch["text"])
+            prev_x1, blank = ch["x1"], False
+        out.append("".join(parts))
+    return "\n".join(out)
+
+def extract_page_text(page, layout: bool = True, x_tolerance: float = 3, engine: str = "layout") -> str:
+    if engine == "lines": t = extract_page_lines(page, x_tolerance=x_tolerance)
+    else: t = page.extract_text(layout=layout, x_tolerance=x_tolerance) or ""
     t = fix_encoding(t)
     if t.strip(): return t
     words = page.extract_words(use_text_flow=True) or []
     return "\n".join(clean_spaces(w.get("text", "")) for w in words if w.get("text"))
 
+# --- TABELLEN (Option "tables": Waren/Leergut aus der Seitengeometrie) ---
+# Die Ankerzeile ("Gesamt" auf Seite 1, "Zusammenfassung" auf Seite 2) legt mit ihren Zahlen die Spalten fest.
+# Zeilen darueber werden ueber die x-Position ihrer Woerter zugeordnet statt ueber Regex und Zahlen-Anzahl;
+# bei linierten Tabellen liefert find_tables die Zeilenbaender (auch fuer umbrochene Bezeichnungen).
+# Gespeichert werden nur Zellen-Strings (mit dem Seitentext im Text-Cache); typisiert wird in parse_goods /
+# parse_empties, die ohne Tabelle weiter die Regex-Variante nutzen.
+TABLE_LAYOUTS = {
+    # Seite: (Name, Anker = erstes Wort der Summenzeile, Zeilenkennung = erstes Wort einer Datenzeile)
+    1: ("goods", re.compile(r"^Gesamt$", re.IGNORECASE), re.compile(r"^\d{6,}$")),
+    2: ("empties", re.compile(r"^Zusammenfassung$", re.IGNORECASE), re.compile(r"^\d{4}$")),
+}
+_CELL_NUMBER_RE = re.compile(r"^(?:-?[0-9][0-9.,]*€?|--)$")
+
+def _word_lines(words: list, y_tolerance: float = 3) -> list:
+    """Woerter zu Zeilen: [{"top", "bottom", "words" (nach x0)}]"""
+    lines = []
+    for w in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and w["top"] - lines[-1]["top"] <= y_tolerance:
+            line = lines[-1]
+        else:
+            line = {"top": w["top"], "bottom": w["bottom"], "words": []}
+            lines.append(line)
+        line["words"].append(w)
+        line["bottom"] = max(line["bottom"], w["bottom"])
+    for line in lines: line["words"].sort(key=lambda w: w["x0"])
+    return lines
+
+def extract_table_cells(page, anchor_re, row_re, x_tolerance: float = 3):
+    """{"total": [...], "rows": [{"label": [[Woerter je Zeile]], "cells": [...]}]} oder None ohne Ankerzeile"""
+    lines = _word_lines(page.extract_words(x_tolerance=x_tolerance))
+    anchor = next((l for l in lines if anchor_re.match(l["words"][0]["text"])), None)
+    if anchor is None: return None
+    numbers = [w for w in anchor["words"][1:] if _CELL_NUMBER_RE.match(w["text"])]
+    if not numbers: return None
+    label_x1 = numbers[0]["x0"] # links der ersten Zahlenspalte: Kennung, Bezeichnung, Saldo
+
+    body = [l for l in lines if l["bottom"] <= anchor["top"] + 0.5]
+    bands = [[l] for l in body]
+    region = page.crop((page.bbox[0], page.bbox[1], page.bbox[2], anchor["top"]))
+    tables = region.find_tables() # nur bei Tabellenlinien; sonst eine Textzeile pro Band
+    if tables:
+        table = max(tables, key=lambda t: t.bbox[3]) # die Tabelle direkt ueber der Ankerzeile
+        bands = [[l for l in body if row.bbox[1] <= (l["top"] + l["bottom"]) / 2 <= row.bbox[3]] for row in table.rows]
+
+    rows = []
+    for band in bands:
+        if not band: continue
+        label = [[w["text"] for w in l["words"] if w["x1"] <= label_x1] for l in band]
+        if not label[0] or not row_re.match(label[0][0]): continue
+        cells = [""] * len(numbers)
+        for l in band:
+            for w in l["words"]:
+                if w["x1"] <= label_x1 or not _CELL_NUMBER_RE.match(w["text"]): continue
+                overlaps = [min(w["x1"], n["x1"]) - max(w["x0"], n["x0"]) for n in numbers]
+                best = max(range(len(numbers)), key=overlaps.__getitem__)
+                if overlaps[best] > 0 and not cells[best]: cells[best] = w["text"]
+        rows.append({"label": [l for l in label if l], "cells": cells})
+    return {"total": [n["text"] for n in numbers], "rows": rows}
+
+def extract_page_tables(page, no: int, x_tolerance: float = 3) -> dict:
+    if no not in TABLE_LAYOUTS: return {}
+    name, anchor_re, row_re = TABLE_LAYOUTS[no]
+    cells = extract_table_cells(page, anchor_re, row_re, x_tolerance)
+    return {name: cells} if cells else {}
+
+# --- SEITENAUSWAHL ---
+# parse_pages liest nur Seite 1 und 2; alle weiteren Seiten (oft gescannte Anhaenge) werden
+# hoechstens fuer den Rohtext gebraucht und deshalb nur auf Wunsch und mit Budget extrahiert.
+PARSED_PAGES = 2
+
+DEFAULT_OPTIONS = {
+    "raw_text": "parsed",       # .txt-Inhalt: "parsed" (Seite 1-2), "deferred" (alle Seiten, Rest nach dem JSON), "none"
+    "raw_time_budget": 10.0,    # Sekunden fuer die restlichen Seiten im Rohtext
+    "page_char_limit": 100000,  # Seiten mit mehr Zeichenobjekten werden nicht extrahiert
+    "page_time_budget": 15.0,   # Sekunden pro Seite fuer extract_page_text (0 = ohne Limit)
+    "regex_time_budget": 2.0,   # Sekunden pro Parser-Stufe mit Config-Regexen (0 = ohne Limit)
+    "layout": True,             # pdfplumber extract_text(layout=...)
+    "x_tolerance": 3,           # pdfplumber extract_text(x_tolerance=...)
+    "engine": "layout",         # "layout" (pdfplumber Layout-Modus) oder "lines" (Zeilen direkt aus den Zeichen)
+    "tables": False,            # Waren/Leergut zusaetzlich aus der Tabellengeometrie (Regex bleibt Fallback)
+    "cache": True,              # Cache fuer Seitentexte und Ergebnisse
+    "cache_dir": None,          # Standard: OCR_CACHE_DIR oder output/cache
+    "cache_max_mb": 512,
+    "cache_max_age_days": 30,
+    "metrics": False,           # _metrics-Abschnitt mit Zeiten pro Seite, Parser-Stufe und Schreibvorgang
+    "profile_dir": None,        # cProfile-Dump (<name>.prof + Top-Liste <name>.txt) pro Dokument
+    "outputs": "json,txt,csv",  # Ausgaben (OUTPUT_SINKS), z.B. "csv_append,jsonl_append" oder "none"
+    "output_group": None,       # Name der Sammeldateien pod_<gruppe>.*; Standard: Tagesdatum, im Batch batch_<zeit>
+    "async_output": False,      # Dateien in einem Hintergrund-Thread schreiben
+    "store_path": None,         # Datenbank der Ausgabe "sqlite"; Standard: OCR_STORE_PATH oder output/pod_results.sqlite
+}
+
+def extraction_options(options: dict = None) -> dict:
+    opts = dict(DEFAULT_OPTIONS)
+    if options: opts.update({k: v for k, v in options.items() if v is not None})
+    return opts
+
+def release_page(page):
+    """Gibt die gecachten Layout-Objekte einer Seite frei (pdfplumber >= 0.10)"""
+    close = getattr(page, "close", None)
+    if close: close()
+
+def text_kwargs(opts: dict) -> dict:
+    """Argumente fuer extract_page_text"""
+    return {"layout": bool(opts["layout"]), "x_tolerance": opts["x_tolerance"], "engine": opts["engine"]}
+
+def text_settings(opts: dict) -> dict:
+    """Einstellungen, die den extrahierten Seitentext beeinflussen (Teil des Text-Cache-Schluessels)"""
+    settings = {"layout": bool(opts["layout"]), "x_tolerance": opts["x_tolerance"]}
+    # "engine" nur wenn abweichend, damit bestehende Text-Cache-Eintraege (Layout-Modus) gueltig bleiben
+    if opts["engine"] != "layout": settings["engine"] = opts["engine"]
+    if opts["tables"]: settings["tables"] = True
+    return settings
+
+# --- BUDGETS (Zeit/Zeichen pro Seite und Parser-Stufe) ---
+# Ueberschreitungen liefern ein Teilergebnis mit "Truncated": true und der Liste "Budget",
+# statt dass der Aufrufer (PdfPlumberService, Batch) erst nach seinem Timeout abbricht.
+class BudgetExceeded(BaseException):
+    """Zeitbudget abgelaufen (von time_limit ausgeloest).
+
+    BaseException wie KeyboardInterrupt: pdfplumber/pdfminer fangen Exception und verpacken sie.
+    """
+
+def _raise_budget_exceeded(signum, frame):
+    raise BudgetExceeded()
+
+@contextmanager
+def time_limit(seconds: float):
+    """Bricht den Block nach seconds mit BudgetExceeded ab - auch mitten in pdfplumber oder einem Regex.
+
+    Braucht SIGALRM (Unix) und den Haupt-Thread; sonst laeuft der Block ohne Limit und nur die
+    aeusseren Timeouts (Batch, PdfPlumberService) greifen.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_budget_exceeded)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+class Budget:
+    """Limits eines Dokuments und die Liste der Ueberschreitungen"""
+
+    def __init__(self, opts: dict):
+        self.page_seconds = opts["page_time_budget"]
+        self.page_chars = opts["page_char_limit"]
+        self.stage_seconds = opts["regex_time_budget"]
+        self.exceeded = []
+
+    def record(self, stage: str, limit: str, value):
+        self.exceeded.append({"stage": stage, "limit": limit, "value": value})
+
+    def apply(self, data: dict):
+        if self.exceeded:
+            data["Truncated"] = True
+            data["Budget"] = self.exceeded
+
+def read_page(page, no: int, opts: dict, budget: Budget):
+    """(Text, None) oder (None, Ueberschreitung), wenn Zeichen- oder Zeitbudget der Seite nicht reicht"""
+    try:
+        with time_limit(budget.page_seconds):
+            n_chars = len(page.chars)
+            if n_chars > budget.page_chars: return None, {"stage": f"page{no}", "limit": "chars", "value": n_chars}
+            return extract_page_text(page, **text_kwargs(opts)), None
+    except BudgetExceeded:
+        return None, {"stage": f"page{no}", "limit": "seconds", "value": budget.page_seconds}
+
+def read_parsed_pages(pdf, opts: dict, metrics=None, budget: Budget = None, tables: dict = None) -> list:
+    """Seitentexte der geparsten Seiten; mit Option tables werden die Tabellenzellen in tables gesammelt"""
+    budget = budget or Budget(opts)
+    pages_text = []
+    for no, page in enumerate(pdf.pages[:PARSED_PAGES], start=1):
+        started = time.perf_counter()
+        text, exceeded = read_page(page, no, opts, budget)
+        if exceeded:
+            budget.record(**exceeded)
+            text = "" # Seite fehlt im Parser; Felder der anderen Seite bleiben erhalten
+        elif opts["tables"] and tables is not None:
+            try:
+                with time_limit(budget.page_seconds): tables.update(extract_page_tables(page, no, opts["x_tolerance"]))
+            except BudgetExceeded:
+                budget.record(f"tables{no}", "seconds", budget.page_seconds)
+        pages_text.append(text)
+        if metrics: metrics.page(no, time.perf_counter() - started, text, skipped=bool(exceeded))
+        release_page(page)
+    return pages_text
+
+def read_remaining_pages(pdf, opts: dict, metrics=None) -> list:
+    """Rohtext der vom Parser nicht genutzten Seiten, begrenzt durch Zeit- und Zeichenbudget"""
+    out = []
+    started = time.monotonic()
+    total = len(pdf.pages)
+    for no, page in enumerate(pdf.pages[PARSED_PAGES:], start=PARSED_PAGES + 1):
+        if time.monotonic() - started > opts["raw_time_budget"]:
+            out.append(f"[Seite {no}-{total}: Zeitbudget fuer Rohtext ueberschritten]")
+            break
+        t0 = time.perf_counter()
+        text, exceeded = read_page(page, no, opts, Budget(opts))
+        if exceeded and exceeded["limit"] == "chars":
+            text = f"[Seite {no}: {exceeded['value']} Zeichen, nicht extrahiert]"
+        elif exceeded:
+            text = f"[Seite {no}: Zeitbudget von {exceeded['value']:g} Sekunden ueberschritten]"
+        out.append(text)
+        if metrics: metrics.page(no, time.perf_counter() - t0, "" if exceeded else text, skipped=bool(exceeded))
+        release_page(page)
+    return out
+
+# --- CACHE (zweistufig) ---
+# Stufe 1 "text": Seitentexte pro PDF-Inhalt und Text-Einstellungen. Bleibt bei Config-Aenderungen gueltig,
+#   damit nach einer Regex-Anpassung nur die Feld-Parser neu laufen (kein pdfplumber-Layout).
+# Stufe 2 "results": fertiges Ergebnis pro Seitentext + Config-Hash + Prozessor-Version.
+PROCESSOR_VERSION = "2.0"
+TEXT_EXTRACTION_VERSION = "1" # erhoehen, wenn sich extract_page_text aendert
+_PROCESSOR_VERSION_FULL = None
+
+def processor_version() -> str:
+    """Version + Hash dieses Skripts, damit jede Code-Aenderung die Ergebnisse invalidiert"""
+    global _PROCESSOR_VERSION_FULL
+    if _PROCESSOR_VERSION_FULL is None:
+        with open(os.path.abspath(__file__), "rb") as f:
+            _PROCESSOR_VERSION_FULL = f"{PROCESSOR_VERSION}+{hashlib.sha256(f.read()).hexdigest()[:12]}"
+    return _PROCESSOR_VERSION_FULL
+
+def _sha256(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+class ExtractionCache:
+    """Seitentexte und Ergebnis-JSON pro Dokument auf der Platte, mit Groessen- und Altersgrenze"""
+
+    EVICT_INTERVAL = 600 # Sekunden zwischen zwei Aufraeum-Laeufen
+
+    def __init__(self, root: str, max_mb: float = 512, max_age_days: float = 30):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age = max_age_days * 86400
+
+    @staticmethod
+    def pdf_hash(pdf_bytes: bytes) -> str:
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    @staticmethod
+    def text_key(pdf_hash: str, settings: dict) -> str:
+        return _sha256(f"{pdf_hash}|{json.dumps(settings, sort_keys=True)}|{PARSED_PAGES}|{TEXT_EXTRACTION_VERSION}|{pdfplumber.__version__}")
+
+    @staticmethod
+    def result_key(text_key: str) -> str:
+        return _sha256(f"{text_key}|{CONFIG_HASH}|{processor_version()}")
+
+    def _path(self, level: str, key: str) -> str:
+        return os.path.join(self.root, level, key[:2], f"{key}.json")
+
+    def _load(self, path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f: entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.max_age: return None
+        try: os.utime(path) # zuletzt benutzt -> wird zuletzt verdraengt
+        except OSError: pass
+        return entry
+
+    def _store(self, path: str, entry: dict):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path) # atomar, auch bei parallelen Batch-Workern
+            self._maybe_evict()
+        except OSError:
+            pass # Cache ist optional, Fehler duerfen die Extraktion nicht stoeren
+
+    def get_text(self, text_key: str):
+        return self._load(self._path("text", text_key))
+
+    def put_text(self, text_key: str, pdf_hash: str, settings: dict, filename: str, pages: list, rest: list = None, tables: dict = None):
+        self._store(self._path("text", text_key), {
+            "key": text_key, "pdf_sha256": pdf_hash, "settings": settings, "filename": filename,
+            "created": time.time(), "pages": pages, "rest": rest, "tables": tables,
+        })
+
+    def get_result(self, result_key: str):
+        return self._load(self._path("results", result_key))
+
+    def put_result(self, result_key: str, text_key: str, result: dict):
+        self._store(self._path("results", result_key), {
+            "key": result_key, "text_key": text_key, "config_hash": CONFIG_HASH, "version": processor_version(),
+            "created": time.time(), "result": {k: v for k, v in result.items() if not k.startswith("_")},
+        })
+
+    def iter_texts(self):
+        """Alle gueltigen Text-Eintraege (fuer reparse_cached)"""
+        for root, dirs, names in os.walk(os.path.join(self.root, "text")):
+            dirs.sort()
+            for name in sorted(names):
+                if not name.endswith(".json"): continue
+                entry = self._load(os.path.join(root, name))
+                if entry: yield entry
+
+    def _maybe_evict(self):
+        marker = os.path.join(self.root, ".last_evict")
+        try:
+            if time.time() - os.path.getmtime(marker) < self.EVICT_INTERVAL: return
+        except OSError:
+            pass
+        with open(marker, "w"): pass
+        self.evict()
+
+    def evict(self) -> int:
+        """Loescht abgelaufene Eintraege und danach die am laengsten unbenutzten bis unter max_bytes"""
+        files = []
+        for level in ("text", "results"):
+            for root, _, names in os.walk(os.path.join(self.root, level)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try: st = os.stat(path)
+                    except OSError: continue
+                    files.append((st.st_mtime, st.st_size, path))
+        now, removed = time.time(), 0
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if now - mtime <= self.max_age and total <= self.max_bytes: break
+            try:
+                os.remove(path)
+                removed += 1
+                total -= size
+            except OSError:
+                pass
+        return removed
+
+_CACHES = {}
+
+def get_cache(opts: dict):
+    """ExtractionCache fuer die Optionen (None, wenn abgeschaltet)"""
+    if not opts.get("cache"): return None
+    root = opts.get("cache_dir") or os.environ.get("OCR_CACHE_DIR") or os.path.join(os.path.dirname(JSON_OUTPUT_DIR), "cache")
+    key = (root, opts["cache_max_mb"], opts["cache_max_age_days"])
+    if key not in _CACHES: _CACHES[key] = ExtractionCache(*key)
+    return _CACHES[key]
+
 # --- TIME EXTRACTION (Updated to use List of Labels) ---
+class TimestampIndex:
+    """Ein Durchlauf ueber den Text: merkt sich alle Datumswerte und den ersten Treffer jedes Labels.
+
+    Ersetzt die frueheren "(?is)label.*?datetime"-Suchen pro Feld. Ergebnis ist identisch,
+    solange sich Labels nicht gegenseitig im Text ueberlappen (bei der aktuellen Config nie der Fall).
+    """
+
+    def __init__(self, text: str, plan: "ExtractionPlan", matches: tuple = None, start: int = 0, end: int = None):
+        """matches: (Datums-Treffer, Label-Treffer) aus einem gemeinsamen Durchlauf ueber mehrere Dokumente
+        (archive.py); text ist dann der verkettete Text und start/end begrenzen das Dokument darin."""
+        self.text = text
+        self.plan = plan
+        self.start, self.end = start, len(text) if end is None else end
+        if matches is None:
+            matches = (plan.dt_scan.finditer(text), plan.label_scan.finditer(text) if plan.label_scan is not None else ())
+        dt_matches, label_matches = matches
+        self.dt_matches = list(dt_matches)
+        self.dt_starts = [m.start() for m in self.dt_matches]
+        self.label_ends = {}
+        for m in label_matches:
+            self.label_ends.setdefault(plan.label_names[m.lastgroup], m.end())
+
+    def datetime_after(self, pos: int) -> str:
+        """Erster Datumswert, der bei pos oder spaeter beginnt"""
+        i = bisect_left(self.dt_starts, pos)
+        if i > 0 and self.dt_matches[i - 1].end() > pos:
+            # Sonderfall: pos liegt innerhalb eines Datums -> direkt ab pos suchen
+            m = self.plan.dt_scan.search(self.text, pos, self.end)
+        else:
+            m = self.dt_matches[i] if i < len(self.dt_matches) else None
+        return m.group(1) if m else ""
+
+    def raw_after_label(self, label_patterns: list) -> str:
+        """Datumswert hinter dem ersten gefundenen Label, noch nicht normalisiert"""
+        for label in label_patterns:
+            if label not in self.label_ends and label not in self.plan.known_labels:
+                # Label nicht aus der Config -> klassische Einzelsuche
+                m = self.plan.time_label(label).search(self.text, self.start, self.end)
+                if m: return m.group(1)
+                continue
+            end = self.label_ends.get(label)
+            if end is None: continue
+            raw = self.datetime_after(end)
+            if raw: return raw
+        return ""
+
+    def dt_after_label(self, label_patterns: list) -> tuple:
+        """(normalisierter Zeitstempel, datetime) - die datetime spart das erneute Parsen fuer Dauern"""
+        raw = self.raw_after_label(label_patterns)
+        return parse_dt(raw, self.plan.date_formats) if raw else ("", None)
+
+    def time_after_label(self, label_patterns: list) -> str:
+        return self.dt_after_label(label_patterns)[0]
+
+    def last_datetime(self) -> str:
+        return normalize_dt(self.dt_matches[-1].group(1)) if self.dt_matches else ""
+
 def get_time_after_label(full_text: str, label_patterns: list) -> str:
-    dt_pat = CONFIG["General"]["DateTimePattern"]
-    for label in label_patterns:
-        # Wir bauen den Regex dynamisch: Label + beliebiger Text + DatumPattern
-        pat = rf"(?is){label}.*?({dt_pat})"
-        m = re.search(pat, full_text)
-        if m:
-            return normalize_dt(m.group(1))
-    return ""
+    return TimestampIndex(full_text, get_plan()).time_after_label(label_patterns)
 
 def parse_temperature_blocks(text: str):
     out = []
@@ -152,10 +834,8 @@ def parse_temperature_blocks(text: str):
     deg = "\u00b0"
     
     # Regex aus Config
-    regex_str = CONFIG["Temperature"]["RegexPattern"]
-    pat = re.compile(regex_str, re.IGNORECASE)
-    
-    range_pat = r"([0-9.,-]+\s*-\s*[0-9.,-]+\s*" + deg + r"?\s*C)"
+    pat = get_plan().temperature
+    range_pat = _TEMP_RANGE_RE
     
     for i, line in enumerate(lines):
         t_line = fix_encoding(line)
@@ -163,41 +843,38 @@ def parse_temperature_blocks(text: str):
         if m:
             chamber, temp = m.group(1).upper(), m.group(2).replace(",", ".")
             rng = ""
-            range_match = re.search(range_pat, t_line[m.end():])
+            range_match = range_pat.search(t_line[m.end():])
             if range_match: rng = clean_spaces(range_match.group(1))
             if not rng and i > 0:
-                rm = re.search(range_pat, lines[i-1])
+                rm = range_pat.search(lines[i-1])
                 if rm: rng = clean_spaces(rm.group(1))
             if not rng and i + 1 < len(lines):
-                rm = re.search(range_pat, lines[i+1])
+                rm = range_pat.search(lines[i+1])
                 if rm: rng = clean_spaces(rm.group(1))
             out.append({"Kammer": chamber, "Wert": temp + deg + "C", "Range": rng})
     return out
 
 def extract_tabular_duration(text: str, label: str) -> str:
     lines = text.split('\n')
-    dt_pat = CONFIG["General"]["DateTimePattern"]
+    plan = get_plan()
+    label_re = plan.word(label)
     for i, line in enumerate(lines):
-        if re.search(rf'\b{label}\b', line, re.IGNORECASE):
+        if label_re.search(line):
             for k in range(1, 4):
                 if i + k >= len(lines): break
                 nxt = lines[i + k]
                 if not clean_spaces(nxt): continue
-                spec = re.search(rf"{dt_pat}\s+(\d{2}:\d{2})", nxt)
-                if spec: return spec.group(1)
-                clean = re.sub(rf"{dt_pat}", '', nxt)
-                durs = re.findall(r"\b(\d{2}:\d{2})\b", clean)
+                spec = plan.dt_duration.search(nxt)
+                if spec: return spec.group(spec.re.groups) # letzte Gruppe = Dauer (DateTimePattern hat eigene Gruppen)
+                clean = plan.dt_any.sub('', nxt)
+                durs = _DURATION_RE.findall(clean)
                 if durs: return durs[0]
                 if "--" in clean: return "--"
                 break
     return ""
 
-def save_raw_text(stem: str, full_text: str):
-    os.makedirs(TXT_OUTPUT_DIR, exist_ok=True)
-    with open(os.path.join(TXT_OUTPUT_DIR, f"{stem}.txt"), "w", encoding="utf-8") as f: f.write(full_text)
-
-def save_csv(stem: str, data: dict):
-    os.makedirs(CSV_OUTPUT_DIR, exist_ok=True)
+def csv_row(data: dict) -> dict:
+    """Flache CSV-Zeile eines Ergebnisses (gleiche Spalten fuer Einzel- und Sammeldatei)"""
     stopp, wg, ls, ab = data.get("StoppInfos", {}), data.get("WarenGesamt", {}), data.get("LeergutSummeSeite1", {}), data.get("Abschluss", {})
     temps = "; ".join([f"{t.get('Kammer', '')}: {t.get('Wert', '')}" for t in data.get("Temperaturen", [])])
     row = {
@@ -217,279 +894,1435 @@ def save_csv(stem: str, data: dict):
         "AnnahmeStatus": ab.get("AnnahmeStatus", ""), "Kommentar": ab.get("Kommentar", ""),
         "FahrerSignatur": ab.get("FahrerSignatur", ""), "Zeitstempel": ab.get("Zeitstempel", ""),
     }
-    with open(os.path.join(CSV_OUTPUT_DIR, f"{stem}.csv"), "w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=row.keys(), delimiter=";")
-        writer.writeheader()
-        writer.writerow(row)
+    return row
+
+def render_csv(rows: list, header: bool = True, fieldnames=None) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames or rows[0].keys(), delimiter=";")
+    if header: writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue()
+
+def render_json(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+# --- AUSGABE (Sinks) ---
+# json/txt/csv: eine Datei pro Dokument; csv_append/jsonl_append: eine Sammeldatei pro Tag bzw.
+# output_group (z.B. ein Batch) mit nur einer Kopfzeile. Option "outputs" waehlt die Sinks aus.
+OUTPUT_SINKS = ("json", "txt", "csv", "csv_append", "jsonl_append", "sqlite")
+_MADE_DIRS = set()
+
+def output_sinks(opts: dict) -> set:
+    value = opts["outputs"]
+    sinks = {s.strip() for s in (value.split(",") if isinstance(value, str) else value)} - {"", "none"}
+    unknown = sinks - set(OUTPUT_SINKS)
+    if unknown: raise ValueError(f"Unbekannte Ausgabe: {', '.join(sorted(unknown))} (erlaubt: {', '.join(OUTPUT_SINKS)})")
+    return sinks
+
+def ensure_dir(path: str):
+    """os.makedirs nur beim ersten Mal pro Prozess (spart Metadaten-Zugriffe auf Netzlaufwerken)"""
+    if path not in _MADE_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _MADE_DIRS.add(path)
+
+def write_file(path: str, text: str, encoding: str = "utf-8", newline: str = None):
+    ensure_dir(os.path.dirname(path))
+    with open(path, "w", encoding=encoding, newline=newline) as f: f.write(text)
+
+def _lock(f, unlock: bool = False):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN if unlock else fcntl.LOCK_EX)
+    elif msvcrt:
+        f.seek(0) # msvcrt sperrt ab der aktuellen Position: immer Byte 0
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK if unlock else msvcrt.LK_LOCK, 1)
+
+def append_file(path: str, text: str, header: str = ""):
+    """Haengt text an; header nur in eine leere Datei. Gesperrt, weil Batch-Worker parallel schreiben."""
+    ensure_dir(os.path.dirname(path))
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        _lock(f)
+        try:
+            f.seek(0, os.SEEK_END)
+            if header and f.tell() == 0: f.write(header)
+            f.write(text)
+            f.flush()
+        finally:
+            _lock(f, unlock=True)
+
+class OutputWriter:
+    """Fuehrt Schreibvorgaenge direkt oder (Option async_output) in einem Hintergrund-Thread aus.
+
+    Inhalte werden vorher im aufrufenden Thread serialisiert; der Thread macht nur die Datei-I/O,
+    damit das naechste Dokument nicht auf langsamen (Netz-)Speicher wartet. Die Queue ist begrenzt,
+    damit ein blockierter Speicher die Extraktion bremst statt den Speicher zu fuellen.
+    """
+
+    def __init__(self, background: bool = False, max_pending: int = 256):
+        self.queue = None
+        self.errors = 0
+        if background:
+            self.queue = queue.Queue(maxsize=max_pending)
+            threading.Thread(target=self._run, name="output-writer", daemon=True).start()
+            atexit.register(self.flush)
+
+    def submit(self, fn, *args):
+        if self.queue is None: fn(*args)
+        else: self.queue.put((fn, args))
+
+    def _run(self):
+        while True:
+            fn, args = self.queue.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"Ausgabe fehlgeschlagen ({args[0] if args else fn.__name__}): {e}", file=sys.stderr)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wartet, bis alle eingereihten Dateien geschrieben sind"""
+        if self.queue is not None: self.queue.join()
+
+_WRITERS = {}
+
+def get_output_writer(opts: dict) -> OutputWriter:
+    background = bool(opts["async_output"])
+    if background not in _WRITERS: _WRITERS[background] = OutputWriter(background)
+    return _WRITERS[background]
+
+def flush_outputs():
+    for writer in _WRITERS.values(): writer.flush()
+
+def save_json(data: dict, json_path: str, writer: OutputWriter = None):
+    (writer or get_output_writer({"async_output": False})).submit(write_file, json_path, render_json(data))
+
+def save_raw_text(stem: str, full_text: str, writer: OutputWriter = None):
+    (writer or get_output_writer({"async_output": False})).submit(write_file, os.path.join(TXT_OUTPUT_DIR, f"{stem}.txt"), full_text)
+
+def save_csv(stem: str, data: dict, writer: OutputWriter = None):
+    (writer or get_output_writer({"async_output": False})).submit(
+        write_file, os.path.join(CSV_OUTPUT_DIR, f"{stem}.csv"), render_csv([csv_row(data)]), "utf-8-sig", "")
+
+def output_group(opts: dict) -> str:
+    return opts["output_group"] or f"{datetime.now():%Y-%m-%d}"
+
+def save_appended(data: dict, sinks: set, opts: dict, writer: OutputWriter = None):
+    """Zeile in die Sammeldateien output/pod_<gruppe>.csv bzw. .jsonl"""
+    writer = writer or get_output_writer({"async_output": False})
+    base = os.path.join(os.path.dirname(JSON_OUTPUT_DIR), f"pod_{output_group(opts)}")
+    if "csv_append" in sinks:
+        row = csv_row(data)
+        writer.submit(append_file, f"{base}.csv", render_csv([row], header=False), "\ufeff" + render_csv([], fieldnames=row.keys()))
+    if "jsonl_append" in sinks:
+        writer.submit(append_file, f"{base}.jsonl", json.dumps(data, ensure_ascii=False) + "\n")
+
+# --- ERGEBNIS-DATENBANK (Ausgabe "sqlite") ---
+# Alle Ergebnisse in einer SQLite-Datei statt hunderttausender Einzeldateien: eine Zeile pro Dokument mit
+# den CSV-Spalten, dazu Datum (Tag der geplanten Lieferung), Error und das komplette Ergebnis als JSON.
+STORE_COLUMNS = list(csv_row({}).keys()) + ["Datum", "Error", "Json"]
+STORE_INDEXES = {"mandant": ("Mandant", "Datum"), "filiale": ("Filiale", "Datum"), "tour": ("Tour", "Datum"), "datum": ("Datum",)}
+STORE_FILTERS = ("Mandant", "Filiale", "Tour")
+
+def result_date(data: dict) -> str:
+    """Tag der geplanten Lieferung (YYYY-MM-DD), sonst Tag der Verarbeitung"""
+    dt = dt_from_norm(data.get("GeplanteLieferung")) or dt_from_norm(data.get("StoppInfos", {}).get("Abfahrt"))
+    return dt.strftime("%Y-%m-%d") if dt else data.get("ProcessedAt", "")[:10]
+
+def store_row(data: dict) -> dict:
+    row = csv_row(data)
+    row.update({"Datum": result_date(data), "Error": data.get("Error", ""), "Json": json.dumps(data, ensure_ascii=False)})
+    return row
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+class ResultStore:
+    """SQLite-Datenbank der Ergebnisse; ein erneut verarbeitetes Dokument (gleicher FileName) ersetzt seine Zeile"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock() # Verbindung wird ggf. vom OutputWriter-Thread benutzt
+
+    def connect(self, create: bool = True) -> sqlite3.Connection:
+        if self._conn is None:
+            if not create and not os.path.exists(self.path): raise ValueError(f"Keine Ergebnis-Datenbank unter {self.path}")
+            ensure_dir(os.path.dirname(os.path.abspath(self.path)))
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL") # Batch-Worker schreiben parallel, Abfragen blockieren nicht
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = ", ".join(_quote(c) + (" PRIMARY KEY" if c == "FileName" else "") for c in STORE_COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS results ({columns})")
+            # Neue CSV-Spalten in bestehenden Datenbanken nachtragen
+            existing = {r[1] for r in conn.execute("PRAGMA table_info(results)")}
+            for c in STORE_COLUMNS:
+                if c not in existing: conn.execute(f"ALTER TABLE results ADD COLUMN {_quote(c)}")
+            for name, cols in STORE_INDEXES.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_results_{name} ON results ({', '.join(map(_quote, cols))})")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def put_rows(self, rows: list):
+        with self._lock:
+            conn = self.connect()
+            sql = f"INSERT OR REPLACE INTO results ({', '.join(map(_quote, STORE_COLUMNS))}) VALUES ({', '.join('?' * len(STORE_COLUMNS))})"
+            conn.executemany(sql, [[row.get(c, "") for c in STORE_COLUMNS] for row in rows])
+            conn.commit()
+
+    def query(self, filters: dict = None, date_from: str = None, date_to: str = None, columns: list = None):
+        """Zeilen als dict; filters: Mandant/Filiale/Tour -> Wert, Datum als YYYY-MM-DD (inklusive)"""
+        columns = columns or [c for c in STORE_COLUMNS if c != "Json"]
+        unknown = set(columns) - set(STORE_COLUMNS)
+        if unknown: raise ValueError(f"Unbekannte Spalte: {', '.join(sorted(unknown))}")
+        where, params = [], []
+        for col, value in (filters or {}).items():
+            if value: where.append(f"{_quote(col)} = ?"); params.append(value)
+        if date_from: where.append("Datum >= ?"); params.append(date_from)
+        if date_to: where.append("Datum <= ?"); params.append(date_to)
+        sql = f"SELECT {', '.join(map(_quote, columns))} FROM results"
+        if where: sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self.connect(create=False).execute(sql + " ORDER BY Datum, FileName", params)
+        for r in rows: yield dict(zip(columns, r))
+
+_STORES = {}
+
+def get_result_store(opts: dict) -> ResultStore:
+    path = opts.get("store_path") or os.environ.get("OCR_STORE_PATH") or os.path.join(os.path.dirname(JSON_OUTPUT_DIR), "pod_results.sqlite")
+    if path not in _STORES: _STORES[path] = ResultStore(path)
+    return _STORES[path]
+
+def save_to_store(data: dict, opts: dict, writer: OutputWriter = None):
+    # Zeile sofort bauen: data wird danach noch ergaenzt (_metrics), der Writer laeuft evtl. spaeter
+    (writer or get_output_writer({"async_output": False})).submit(get_result_store(opts).put_rows, [store_row(data)])
+
+def import_json_results(source: str, store: ResultStore, batch_size: int = 500) -> int:
+    """Bestehende JSON-Ergebnisse (output/JSON, rekursiv) in die Datenbank uebernehmen"""
+    count, rows = 0, []
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".json"): continue
+            try:
+                with open(os.path.join(root, name), "r", encoding="utf-8") as f: data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Uebersprungen: {name} ({e})", file=sys.stderr)
+                continue
+            if not isinstance(data, dict) or "FileName" not in data: continue
+            rows.append(store_row(data))
+            if len(rows) >= batch_size:
+                store.put_rows(rows)
+                count, rows = count + len(rows), []
+    if rows: store.put_rows(rows)
+    return count + len(rows)
+
+def export_rows(rows, out_path: str = None) -> int:
+    """Abfrage-Ergebnis als .csv (Spalten) oder .jsonl (komplette Ergebnisse); ohne Pfad JSON-Zeilen auf stdout"""
+    count = 0
+    if out_path and out_path.lower().endswith(".csv"):
+        ensure_dir(os.path.dirname(os.path.abspath(out_path)))
+        with open(out_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = None
+            for row in rows:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=row.keys(), delimiter=";")
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+        return count
+    if out_path and not out_path.lower().endswith(".jsonl"): raise ValueError("Export nach .csv oder .jsonl")
+    f = open(out_path, "w", encoding="utf-8") if out_path else sys.stdout
+    try:
+        for row in rows:
+            f.write((row["Json"] if out_path else json.dumps(row, ensure_ascii=False)) + "\n")
+            count += 1
+    finally:
+        if out_path: f.close()
+    return count
 
 # --- ROBUSTE FAHRZEUG-EXTRAKTION (Konfigurierbar) ---
 def extract_vehicle_full(text):
-    patterns = CONFIG["Vehicle"]["PlatePatterns"]
     matches = []
-    for pattern in patterns:
-        for m in re.finditer(pattern, text):
+    for pattern in get_plan().plates:
+        for m in pattern.finditer(text):
             # Gruppenlogik: Pattern 1 hat 1 Gruppe, Pattern 2 hat 2 mögliche Gruppen in der Regex OR Verknüpfung
             # Wir nehmen einfach die erste nicht-leere Gruppe
             val = next((g for g in m.groups() if g), None)
             if val:
-                if re.search(r"\d{4}-\d{2}", val): continue # Datum filtern
+                if _PLATE_DATE_RE.search(val): continue # Datum filtern
                 matches.append(clean_spaces(val))
     return matches
 
 
-def process_pdf(path: str, original_filename: str = None):
-    load_config() # Config laden
+class ParseContext:
+    """Seitentexte und gemeinsame Zwischenergebnisse der Feld-Parser fuer ein Dokument"""
+
+    def __init__(self, pages_text: list, plan: ExtractionPlan, tables: dict = None):
+        self.plan = plan
+        self.pages_text = pages_text
+        self.tables = tables or {} # Zellen aus extract_page_tables (Option "tables")
+        self.text1 = pages_text[0] if pages_text else ""
+        self.lines1 = [clean_spaces(l) for l in self.text1.split("\n") if clean_spaces(l)]
+        self.text2 = pages_text[1] if len(pages_text) > 1 else None
+        self._ts_index = None
+        self.confirmation = None # "Der Filialleiter ... Unterschrift" (nur mit Seite 2)
+
+    @property
+    def ts_index(self) -> TimestampIndex:
+        if self._ts_index is None: self._ts_index = TimestampIndex(self.text1, self.plan)
+        return self._ts_index
+
+def parse_header(data: dict, ctx: ParseContext):
+    if ctx.lines1: data["Depot"] = ctx.lines1[0]
+
+# --- FAHRZEUG & ANHÄNGER ---
+def parse_vehicle(data: dict, ctx: ParseContext):
+    text1, plan = ctx.text1, ctx.plan
+    all_plates = extract_vehicle_full(text1)
+    if all_plates:
+        data["Fahrzeug"] = all_plates[0]
+        # Zweites Kennzeichen als Anhaenger, auch wenn gleich (manche LKW haben gleiche Nummern)
+        if len(all_plates) > 1:
+            data["Anhaenger"] = all_plates[1]
+
+    vehicle_from_keywords(data, text1, plan)
+
+def vehicle_from_keywords(data: dict, text1: str, plan: ExtractionPlan):
+    """Fahrzeug/Anhaenger ueber die Keywords, wenn kein Kennzeichen-Pattern getroffen hat"""
+    # Fallback über Keywords für Fahrzeug
+    if not data["Fahrzeug"]:
+        for kw_re in plan.vehicle_keywords:
+            m = kw_re.search(text1)
+            if m: 
+                data["Fahrzeug"] = clean_spaces(m.group(1).split('\n')[0])
+                break
+
+    # Fallback über Keywords für Anhaenger - IMMER suchen wenn leer
+    if not data["Anhaenger"]:
+        for kw_re in plan.trailer_keywords:
+            m = kw_re.search(text1)
+            if m:
+                trailer_val = clean_spaces(m.group(1).split('\n')[0])
+                # Nur setzen wenn nicht leer und nicht nur Striche/Leerzeichen
+                if trailer_val and trailer_val not in ['--', '-', '']:
+                    data["Anhaenger"] = trailer_val
+                break
+
+# --- FAHRER ---
+def parse_driver(data: dict, ctx: ParseContext):
+    lines1, plan = ctx.lines1, ctx.plan
+    ignore_drivers = plan.driver_ignore
+
+    for i, line in enumerate(lines1):
+        # Check ob Zeile ein Fahrer-Keyword enthält
+        if plan.driver_keyword.search(line):
+            for j in range(i + 1, min(i + 6, len(lines1))):
+                cand = lines1[j]
+                if any(bad in cand.upper() for bad in ignore_drivers): continue
+                if _TRAILING_ZIP_RE.search(cand): continue
+                name_match = plan.driver_name.search(cand)
+                if name_match:
+                    found_name = clean_spaces(name_match.group(1))
+                    if found_name != data.get("Fahrzeug"): 
+                        data["Fahrer"] = found_name; break
+            break
+
+# --- ADRESSE ---
+def parse_address(data: dict, ctx: ParseContext):
+    lines1, plan = ctx.lines1, ctx.plan
+    for i, line in enumerate(lines1):
+        if plan.address_keyword.search(line):
+            for j in range(i + 1, min(i + 7, len(lines1))):
+                cand = lines1[j]
+                if plan.zip_code.search(cand) and len(cand) > 10:
+                    if "Telefon" not in cand and "Helpdesk" not in cand: 
+                        data["Adresse"] = clean_spaces(cand); break
+            break
+
+    if not data["Adresse"] or "…" in data["Adresse"]:
+        haupt_match = plan.main_note.search(ctx.text1)
+        if haupt_match: data["Adresse"] = clean_spaces(haupt_match.group(1))
+
+# --- SANITY CHECK (Logik bleibt im Python Code) ---
+def check_sanity(data: dict, ctx: ParseContext):
+    anh = data.get("Anhaenger", "")
+    fahr = data.get("Fahrer", "")
+    adr = data.get("Adresse", "")
+
+    if anh and anh == adr: data["Anhaenger"] = ""
+    elif "," in anh or _STREET_RE.search(anh):
+        data["Anhaenger"] = ""
+
+    if fahr and fahr == adr: data["Fahrer"] = ""
+    elif _STREET_RE.search(fahr):
+        data["Fahrer"] = ""
+
+# --- TIMESTAMPS ---
+def parse_timestamps(data: dict, ctx: ParseContext):
+    text1, plan = ctx.text1, ctx.plan
+    time_labels = plan.time_labels
+    ts_index = ctx.ts_index
+    data["GeplanteLieferung"] = ts_index.time_after_label(time_labels["GeplanteLieferung"])
+    times = {key: ts_index.dt_after_label(time_labels[key]) for key in ("BeginnLieferung", "EndeLieferung", "Abfahrt")}
+
+    stopp = {
+        "GeplantAnkunft": ts_index.time_after_label(time_labels["GeplantAnkunft"]),
+        "TatsAnkunft": ts_index.time_after_label(time_labels["TatsAnkunft"]),
+        "BeginnLieferung": times["BeginnLieferung"][0],
+        "EndeLieferung": times["EndeLieferung"][0],
+        "Abfahrt": times["Abfahrt"][0],
+        "Lieferzeit": extract_tabular_duration(text1, "Lieferzeit"),
+        "Standzeit": extract_tabular_duration(text1, "Standzeit"),
+        "LeistungPuenktlichkeit": ""
+    }
+    if not stopp["Lieferzeit"]: stopp["Lieferzeit"] = hhmm_between(times["BeginnLieferung"][1], times["EndeLieferung"][1])
+    if not stopp["Standzeit"] or stopp["Standzeit"] == "":
+        if stopp["Abfahrt"]: stopp["Standzeit"] = hhmm_between(times["EndeLieferung"][1], times["Abfahrt"][1])
+        else: stopp["Standzeit"] = "--"
+
+    # Pünktlichkeit Patterns
+    for pat in plan.punctuality:
+        m = pat.search(text1)
+        if m:
+            status, zeit = m.group(1).strip(), m.group(2) if m.lastindex and m.lastindex >= 2 else ""
+            stopp["LeistungPuenktlichkeit"] = f"{status} ({zeit})" if zeit else status
+            break
+    data["StoppInfos"] = stopp
+
+def parse_temperatures(data: dict, ctx: ParseContext):
+    data["Temperaturen"] = parse_temperature_blocks(ctx.text1)
+
+# --- WAREN TABELLE ---
+def goods_row(values) -> dict:
+    """Lieferschein, AnzArtikel, MengeBestellt, MengeGeliefert, MengeErhalten, Differenz, GesamtGewicht, GesPreis"""
+    return {
+        "Lieferschein": values[0], "AnzArtikel": int(values[1]),
+        "MengeBestellt": int(values[2]), "MengeGeliefert": int(values[3]),
+        "MengeErhalten": values[4].replace(",", "."),
+        "Differenz": float(values[5].replace(",", ".")),
+        "GesamtGewicht": values[6].replace(",", "."), "GesPreis": values[7].replace(",", ".")
+    }
+
+def goods_total(values) -> dict:
+    """Summenzeile "Gesamt": die sieben Zahlen ab AnzArtikel"""
+    return {
+        "AnzArtikel": int(values[0]), "MengeBestellt": int(values[1]),
+        "MengeGeliefert": int(values[2]), "MengeErhalten": values[3].replace(",", "."),
+        "Differenz": values[4].replace(",", "."), "GesamtGewicht": values[5].replace(".", "").replace(",", "."),
+        "GesPreis": values[6].replace(",", ".").replace("€", "").strip()
+    }
+
+def table_consistent(table: dict, columns) -> bool:
+    """Tabellenzeilen nur verwenden, wenn ihre Spaltensummen die Ankerzeile ergeben (sonst Spalten falsch erkannt)"""
+    rows = table["rows"]
+    return bool(rows) and all(sum(clean_int(r["cells"][i]) for r in rows) == clean_int(table["total"][i]) for i in columns)
+
+def parse_goods(data: dict, ctx: ParseContext):
+    plan = ctx.plan
+    table = ctx.tables.get("goods")
+    # Summen pruefen: AnzArtikel, MengeBestellt, MengeGeliefert
+    if table and len(table["total"]) == 7 and table_consistent(table, (0, 1, 2)):
+        data["Waren"] = [goods_row([r["label"][0][0]] + r["cells"]) for r in table["rows"] if all(r["cells"])]
+        data["WarenGesamt"] = goods_total(table["total"])
+        return
+
+    for line in ctx.lines1:
+        m = plan.goods_row.search(line)
+        if m: data["Waren"].append(goods_row(m.groups()))
+
+    ges_match = plan.goods_total.search(ctx.text1)
+    if ges_match:
+        data["WarenGesamt"] = goods_total(ges_match.groups())
+
+# --- ABSCHLUSS ---
+def parse_conclusion(data: dict, ctx: ParseContext):
+    text1 = ctx.text1
+    # Annahmebereitschaft etc. ist sehr spezifisch, Keywords ggf. anpassen
+    annahme_block = _ANNAHME_RE.search(text1)
+    annahme_text = " ".join([l.strip() for l in annahme_block.group(1).split('\n') if l.strip() and "Annahmebereitschaft" not in l]) if annahme_block else ""
+
+    komm = _KOMMENTAR_RE.search(text1)
+
+    data["Abschluss"] = {
+        "AnnahmeStatus": annahme_text,
+        "Kommentar": clean_spaces(komm.group(1)) if komm else "",
+        "FahrerSignatur": "",
+        "Zeitstempel": ctx.ts_index.last_datetime()
+    }
+
+# --- LEERGUT SEITE 2 ---
+def parse_empties_table(data: dict, ctx: ParseContext, table: dict):
+    """Leergut aus den Tabellenzellen: die Spalten stehen fest, statt aus der Zahlen-Anzahl geraten zu werden"""
+    # Spalten wie in der Zusammenfassung: Geplant, Anlieferung, [weitere,] Abholung, Differenz
+    abh_idx, diff_idx = (3, 4) if len(table["total"]) == 5 else (2, 3)
+    for row in table["rows"]:
+        first = row["label"][0]
+        saldo = first[-1] if len(first) > 2 and _CELL_NUMBER_RE.match(first[-1]) else ""
+        name_words = first[1:-1] if saldo else first[1:]
+        name_words = name_words + [w for line in row["label"][1:] for w in line] # umbrochene Bezeichnung
+        cells = row["cells"]
+        data["LeergutDetails"].append({
+            "ArtikelNr": first[0], "Bezeichnung": clean_spaces(" ".join(name_words).replace("--", "")), "Saldo": saldo,
+            "Geplant": clean_int(cells[0]), "Anlieferung": clean_int(cells[1]),
+            "Abholung": clean_int(cells[abh_idx]), "Differenz": clean_int(cells[diff_idx])
+        })
+    z_nums = [clean_int(v) for v in table["total"]]
+    geplant, anl, abh, diff = z_nums[0], z_nums[1], z_nums[abh_idx], z_nums[diff_idx]
+    data["LeergutZusammenfassung"] = {"Geplant": geplant, "Anlieferung": anl, "Abholung": abh, "Differenz": diff}
+    best = ctx.confirmation
+    data["LeergutSummeSeite1"] = {"Anlieferung": anl, "Zurueck": abh, "Differenz": diff, "Bestaetigung": clean_spaces(best.group(0)) if best else ""}
+
+def parse_empties(data: dict, ctx: ParseContext):
+    table = ctx.tables.get("empties")
+    # Summen pruefen: Geplant, Anlieferung
+    if ctx.text2 is not None and table and len(table["total"]) >= 4 and table_consistent(table, (0, 1)):
+        ctx.confirmation = ctx.plan.signature_confirm.search(ctx.text1)
+        parse_empties_table(data, ctx, table)
+    elif ctx.text2 is not None:
+        text2, plan = ctx.text2, ctx.plan
+        lines2 = [clean_spaces(l) for l in text2.split("\n") if clean_spaces(l)]
+
+        for line in lines2:
+            m_gen = _LEERGUT_ROW_RE.match(line)
+            if m_gen:
+                art_nr, name, saldo, rest = m_gen.group(1), clean_spaces(m_gen.group(2).replace("--", "")), m_gen.group(3).strip(), m_gen.group(4)
+                nums = _INT_RE.findall(rest)
+                anl = nums[1] if len(nums) >= 2 else 0
+                abh = nums[3] if len(nums) == 5 else (nums[2] if len(nums) == 4 else 0)
+                diff = nums[4] if len(nums) == 5 else (nums[3] if len(nums) == 4 else 0)
+
+                data["LeergutDetails"].append({
+                    "ArtikelNr": art_nr, "Bezeichnung": name, "Saldo": saldo, "Geplant": clean_int(nums[0]),
+                    "Anlieferung": clean_int(anl), "Abholung": clean_int(abh), "Differenz": clean_int(diff)
+                })
+
+        zus = plan.empties_summary.search(text2)
+        ctx.confirmation = best = plan.signature_confirm.search(ctx.text1)
+
+        if zus:
+            z_nums = _INT_RE.findall(zus.group(1))
+            if len(z_nums) >= 4:
+                geplant, anl = clean_int(z_nums[0]), clean_int(z_nums[1])
+                abh_idx, diff_idx = (3, 4) if len(z_nums) == 5 else (2, 3)
+                abh, diff = clean_int(z_nums[abh_idx]), clean_int(z_nums[diff_idx])
+                data["LeergutZusammenfassung"] = {"Geplant": geplant, "Anlieferung": anl, "Abholung": abh, "Differenz": diff}
+                data["LeergutSummeSeite1"] = {"Anlieferung": anl, "Zurueck": abh, "Differenz": diff, "Bestaetigung": clean_spaces(best.group(0)) if best else ""}
+
+    if not data["LeergutSummeSeite1"]:
+        best = ctx.confirmation
+        data["LeergutSummeSeite1"] = {"Anlieferung": 0, "Zurueck": 0, "Differenz": 0, "Bestaetigung": clean_spaces(best.group(0)) if best else ""}
+
+# --- SIGNATUR (nur bei Dokumenten mit Seite 2) ---
+def parse_signature(data: dict, ctx: ParseContext):
+    if ctx.text2 is None: return
+    text1, plan = ctx.text1, ctx.plan
+    sig_matches = []
+    for skw_re in plan.signature_keywords:
+        sig_matches.extend(skw_re.finditer(text1))
+
+    if sig_matches:
+        # Sortieren nach Position um den letzten zu finden
+        sig_matches.sort(key=lambda x: x.end())
+        search_chunk = text1[sig_matches[-1].end():sig_matches[-1].end()+5000]
+        ignore_sig = plan.signature_ignore
+
+        for s_line in search_chunk.split('\n'):
+            slc = clean_spaces(s_line)
+            if not slc or any(ig in slc.lower() for ig in ignore_sig): continue
+            if _SHORT_DATE_RE.search(slc):
+                found = _SHORT_DATE_TAIL_RE.sub("", slc).strip()
+                if len(found) > 2: data["Abschluss"]["FahrerSignatur"] = found; break
+            elif _NAME_ONLY_RE.match(slc) and len(slc) > 2: data["Abschluss"]["FahrerSignatur"] = slc; break
+
+# Reihenfolge ist relevant: check_sanity braucht Fahrzeug/Fahrer/Adresse, parse_signature den Abschluss
+PARSE_STAGES = [
+    ("header", parse_header),
+    ("vehicle", parse_vehicle),
+    ("driver", parse_driver),
+    ("address", parse_address),
+    ("sanity", check_sanity),
+    ("timestamps", parse_timestamps),
+    ("temperatures", parse_temperatures),
+    ("goods", parse_goods),
+    ("conclusion", parse_conclusion),
+    ("empties", parse_empties),
+    ("signature", parse_signature),
+]
+
+def parse_pages(data: dict, pages_text: list, plan: ExtractionPlan, timings: dict = None, budget: Budget = None, tables: dict = None):
+    """Befuellt data aus den Seitentexten (Seite 1: Kopf, Zeiten, Waren; Seite 2: Leergut).
+
+    Mit timings werden die Sekunden pro Parser-Stufe eingetragen. Mit budget wird jede Stufe nach
+    regex_time_budget abgebrochen; bis dahin gefundene Felder bleiben, die naechste Stufe laeuft weiter.
+    """
+    ctx = ParseContext(pages_text, plan, tables)
+    for name, stage in PARSE_STAGES:
+        started = time.perf_counter()
+        if budget is None:
+            stage(data, ctx)
+        else:
+            try:
+                with time_limit(budget.stage_seconds): stage(data, ctx)
+            except BudgetExceeded:
+                budget.record(name, "seconds", budget.stage_seconds)
+        if timings is not None: timings[name] = time.perf_counter() - started
+
+def parse_text(data: dict, pages_text: list, rest_text: list, plan: ExtractionPlan, timings: dict = None, budget: Budget = None,
+               tables: dict = None):
+    """Feld-Parsing aus den Seitentexten; Dokumente ganz ohne Text bekommen nur den Fehlerhinweis"""
+    if not any(t.strip() for t in pages_text + (rest_text or [])):
+        data["Error"] = "No extractable text"
+    else:
+        parse_pages(data, pages_text, plan, timings, budget, tables)
+
+def filename_fields(filename: str) -> dict:
+    """Mandant, Filiale und Tour aus dem Dateinamen (POD_<Mandant>_<Filiale>_<x>_<Tour>.pdf)"""
+    parts = os.path.splitext(filename)[0].split("_")
+    return {"Mandant": parts[1] if len(parts) > 1 else "", "Filiale": parts[2] if len(parts) > 2 else "",
+            "Tour": parts[4] if len(parts) > 4 else ""}
+
+def new_result(filename: str) -> dict:
+    """Leeres Ergebnis; Mandant, Filiale und Tour stammen aus dem Dateinamen"""
+    fields = filename_fields(filename)
+    return {
+        "FileName": filename, "ProcessedAt": datetime.now().astimezone().isoformat(), "Mandant": fields["Mandant"],
+        "Depot": "", "Filiale": fields["Filiale"], "Tour": fields["Tour"],
+        "Fahrzeug": "", "Anhaenger": "", "Fahrer": "", "Adresse": "", "GeplanteLieferung": "",
+        "StoppInfos": {}, "Temperaturen": [], "Waren": [], "WarenGesamt": {}, "LeergutSummeSeite1": {},
+        "LeergutDetails": [], "LeergutZusammenfassung": {}, "Abschluss": {}
+    }
+
+# Felder aus Dateiname/Zeitpunkt - werden bei einem Cache-Treffer nicht uebernommen
+FILENAME_FIELDS = ("FileName", "ProcessedAt", "Mandant", "Filiale", "Tour")
+
+# --- METRIKEN (Option "metrics") ---
+def peak_rss_mb():
+    """Hoechster Speicherverbrauch des Prozesses in MB (None ohne resource-Modul, z.B. Windows)"""
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 1024 / (1024 if sys.platform == "darwin" else 1), 1) # macOS: Bytes, Linux: KB
+
+class DocumentMetrics:
+    """Sammelt Zeiten und Zeichenzahlen eines Dokuments fuer den _metrics-Abschnitt"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rss_before = peak_rss_mb()
+        self.pages = []   # extract_page_text pro Seite
+        self.parsers = {} # Sekunden pro Parser-Stufe (PARSE_STAGES)
+        self.writes = {}  # Sekunden pro Ausgabedatei
+        self.profile = None
+
+    def page(self, no: int, seconds: float, text: str, skipped: bool = False):
+        entry = {"page": no, "seconds": round(seconds, 4), "chars": len(text)}
+        if skipped: entry["skipped"] = True
+        self.pages.append(entry)
+
+    def write(self, name: str, fn, *args):
+        started = time.perf_counter()
+        try: return fn(*args)
+        finally: self.writes[name] = round(time.perf_counter() - started, 4)
+
+    def to_dict(self, pages_text: list, rest_text: list) -> dict:
+        peak = peak_rss_mb()
+        out = {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "pages": self.pages,
+            "parsers": {k: round(v, 5) for k, v in self.parsers.items()},
+            "writes": self.writes,
+            "chars": {"parsed": sum(len(t) for t in pages_text or []), "rest": sum(len(t) for t in rest_text or [])},
+            # Prozess-Peak; growth > 0 heisst, dieses Dokument hat den bisherigen Hoechstwert angehoben
+            "peak_rss_mb": peak,
+            "peak_rss_growth_mb": round(peak - self.rss_before, 1) if peak is not None else None,
+        }
+        if self.profile: out["profile"] = self.profile
+        return out
+
+def dump_profile(profiler: cProfile.Profile, profile_dir: str, stem: str) -> str:
+    """Schreibt <stem>.prof (fuer snakeviz/pstats) und die 30 teuersten Funktionen als <stem>.txt"""
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, stem)
+    profiler.dump_stats(f"{base}.prof")
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(30)
+    return f"{base}.prof"
+
+def emit_result(data: dict, metrics: "DocumentMetrics" = None, pages_text: list = None, rest_text: list = None):
+    """Ergebnis-JSON nach stdout (fuer PdfPlumberService); metrics: Stand bis hierher"""
+    out = dict(data, _metrics=metrics.to_dict(pages_text, rest_text)) if metrics else data
+    print(json.dumps(out, ensure_ascii=False, indent=2), flush=True)
+
+def process_pdf(path: str, original_filename: str = None, emit: bool = True, options: dict = None, pdf_bytes: bytes = None) -> dict:
+    """Extrahiert ein PDF von path oder, falls pdf_bytes gesetzt ist, direkt aus dem Speicher (ohne Temp-Datei)"""
+    load_config() # Config laden (nur bei Aenderung der Datei)
+    plan = get_plan()
+    opts = extraction_options(options)
+    sinks = output_sinks(opts)
+    writer = get_output_writer(opts)
+    metrics = DocumentMetrics() if opts["metrics"] else None
+    budget = Budget(opts)
+    profiler = None
+    if opts["profile_dir"]:
+        profiler = cProfile.Profile()
+        profiler.enable()
     
     # Wenn ein Original-Dateiname uebergeben wurde, diesen verwenden
     if original_filename:
         filename = original_filename
-    else:
+    elif path:
         filename = os.path.basename(path)
+    else:
+        filename = "stdin.pdf"
     
     stem = os.path.splitext(filename)[0]
-    parts = stem.split("_")
-    os.makedirs(JSON_OUTPUT_DIR, exist_ok=True)
     json_path = os.path.join(JSON_OUTPUT_DIR, f"{stem}.json")
+    data = new_result(filename)
+    cache = get_cache(opts)
     
-    data = {
-        "FileName": filename, "ProcessedAt": datetime.now().astimezone().isoformat(), "Mandant": parts[1] if len(parts) > 1 else "",
-        "Depot": "", "Filiale": parts[2] if len(parts) > 2 else "", "Tour": parts[4] if len(parts) > 4 else "",
-        "Fahrzeug": "", "Anhaenger": "", "Fahrer": "", "Adresse": "", "GeplanteLieferung": "",
-        "StoppInfos": {}, "Temperaturen": [], "Waren": [], "WarenGesamt": {}, "LeergutSummeSeite1": {},
-        "LeergutDetails": [], "LeergutZusammenfassung": {}, "Abschluss": {}
-    }
-    
+    pdf, entry = None, None
+    pages_text, rest_text, tables = None, None, {}
+    cache_status, pdf_hash, text_key, result_key = "miss", None, None, None
+    settings = text_settings(opts)
+    text_dirty = False # Seitentexte neu extrahiert -> in den Text-Cache schreiben
+    cacheable = False
     try:
-        with pdfplumber.open(path) as pdf:
-            pages_text = [extract_page_text(p) for p in pdf.pages]
-            full_text = "\n\n".join([t for t in pages_text if t])
-            save_raw_text(stem, full_text)
-            if not full_text.strip():
-                data["Error"] = "No extractable text"
-                _save_and_output(data, json_path); save_csv(stem, data); return
-            
-            text1 = pages_text[0] if pages_text else ""
-            lines1 = [clean_spaces(l) for l in text1.split("\n") if clean_spaces(l)]
-            if lines1: data["Depot"] = lines1[0]
-            
-            # --- FAHRZEUG & ANHÄNGER ---
-            all_plates = extract_vehicle_full(text1)
-            if all_plates:
-                data["Fahrzeug"] = all_plates[0]
-                # Zweites Kennzeichen als Anhaenger, auch wenn gleich (manche LKW haben gleiche Nummern)
-                if len(all_plates) > 1:
-                    data["Anhaenger"] = all_plates[1]
-            
-            # Fallback über Keywords für Fahrzeug
-            if not data["Fahrzeug"]:
-                for kw in CONFIG["Vehicle"]["Keywords"]:
-                    m = re.search(rf"{kw}\s*:?[\s\n]+(.+)", text1)
-                    if m: 
-                        data["Fahrzeug"] = clean_spaces(m.group(1).split('\n')[0])
-                        break
-            
-            # Fallback über Keywords für Anhaenger - IMMER suchen wenn leer
-            if not data["Anhaenger"]:
-                for kw in CONFIG["Vehicle"]["TrailerKeywords"]:
-                    m = re.search(rf"{kw}\s*:?[\s\n]+(.+)", text1)
-                    if m:
-                        trailer_val = clean_spaces(m.group(1).split('\n')[0])
-                        # Nur setzen wenn nicht leer und nicht nur Striche/Leerzeichen
-                        if trailer_val and trailer_val not in ['--', '-', '']:
-                            data["Anhaenger"] = trailer_val
-                        break
-            
-            # --- FAHRER ---
-            ignore_drivers = [x.upper() for x in CONFIG["Driver"]["IgnoreList"]]
-            driver_keywords = CONFIG["Driver"]["Keywords"]
-            driver_name_pattern = CONFIG["Driver"]["NamePattern"]
-            
-            for i, line in enumerate(lines1):
-                # Check ob Zeile ein Fahrer-Keyword enthält
-                if any(re.search(rf"(?i)\b{kw}\b", line) for kw in driver_keywords):
-                    for j in range(i + 1, min(i + 6, len(lines1))):
-                        cand = lines1[j]
-                        if any(bad in cand.upper() for bad in ignore_drivers): continue
-                        if re.search(r"\d{4,5}\s*$", cand): continue
-                        name_match = re.search(driver_name_pattern, cand)
-                        if name_match:
-                            found_name = clean_spaces(name_match.group(1))
-                            if found_name != data.get("Fahrzeug"): 
-                                data["Fahrer"] = found_name; break
-                    break
-            
-            # --- ADRESSE ---
-            addr_keywords = CONFIG["Address"]["Keywords"]
-            zip_pattern = CONFIG["General"]["ZipCodePattern"]
-            
-            for i, line in enumerate(lines1):
-                if any(re.search(rf"(?i)\b{kw}\b", line) for kw in addr_keywords):
-                    for j in range(i + 1, min(i + 7, len(lines1))):
-                        cand = lines1[j]
-                        if re.search(zip_pattern, cand) and len(cand) > 10:
-                            if "Telefon" not in cand and "Helpdesk" not in cand: 
-                                data["Adresse"] = clean_spaces(cand); break
-                    break
-            
-            if not data["Adresse"] or "…" in data["Adresse"]:
-                main_note_pat = CONFIG["Address"]["MainNotePattern"]
-                haupt_match = re.search(main_note_pat, text1, re.IGNORECASE)
-                if haupt_match: data["Adresse"] = clean_spaces(haupt_match.group(1))
-
-            # --- SANITY CHECK (Logik bleibt im Python Code) ---
-            anh = data.get("Anhaenger", "")
-            fahr = data.get("Fahrer", "")
-            adr = data.get("Adresse", "")
-            
-            if anh and anh == adr: data["Anhaenger"] = ""
-            elif "," in anh or re.search(r"\b(Str\.|Strasse|Straße|Weg|Platz|Gasse)\b", anh, re.IGNORECASE):
-                data["Anhaenger"] = ""
-            
-            if fahr and fahr == adr: data["Fahrer"] = ""
-            elif re.search(r"\b(Str\.|Strasse|Straße|Weg|Platz|Gasse)\b", fahr, re.IGNORECASE):
-                data["Fahrer"] = ""
-            # -----------------------------------------------------
-
-            # Timestamps
-            time_labels = CONFIG["Timestamps"]["Labels"]
-            data["GeplanteLieferung"] = get_time_after_label(text1, time_labels["GeplanteLieferung"])
-            
-            stopp = {
-                "GeplantAnkunft": get_time_after_label(text1, time_labels["GeplantAnkunft"]),
-                "TatsAnkunft": get_time_after_label(text1, time_labels["TatsAnkunft"]),
-                "BeginnLieferung": get_time_after_label(text1, time_labels["BeginnLieferung"]),
-                "EndeLieferung": get_time_after_label(text1, time_labels["EndeLieferung"]),
-                "Abfahrt": get_time_after_label(text1, time_labels["Abfahrt"]),
-                "Lieferzeit": extract_tabular_duration(text1, "Lieferzeit"),
-                "Standzeit": extract_tabular_duration(text1, "Standzeit"),
-                "LeistungPuenktlichkeit": ""
-            }
-            if not stopp["Lieferzeit"]: stopp["Lieferzeit"] = hhmm_delta(stopp["BeginnLieferung"], stopp["EndeLieferung"])
-            if not stopp["Standzeit"] or stopp["Standzeit"] == "":
-                if stopp["Abfahrt"]: stopp["Standzeit"] = hhmm_delta(stopp["EndeLieferung"], stopp["Abfahrt"])
-                else: stopp["Standzeit"] = "--"
-            
-            # Pünktlichkeit Patterns
-            puenkt_patterns = CONFIG["Timestamps"]["PunctualityPatterns"]
-            for pat in puenkt_patterns:
-                m = re.search(pat, text1, re.IGNORECASE)
-                if m:
-                    status, zeit = m.group(1).strip(), m.group(2) if m.lastindex and m.lastindex >= 2 else ""
-                    stopp["LeistungPuenktlichkeit"] = f"{status} ({zeit})" if zeit else status
-                    break
-            data["StoppInfos"] = stopp
-            
-            data["Temperaturen"] = parse_temperature_blocks(text1)
-            
-            # --- WAREN TABELLE ---
-            waren_pattern = CONFIG["Goods"]["TablePattern"]
-            for line in lines1:
-                m = re.search(waren_pattern, line)
-                if m:
-                    data["Waren"].append({
-                        "Lieferschein": m.group(1), "AnzArtikel": int(m.group(2)),
-                        "MengeBestellt": int(m.group(3)), "MengeGeliefert": int(m.group(4)),
-                        "MengeErhalten": m.group(5).replace(",", "."),
-                        "Differenz": float(m.group(6).replace(",", ".")),
-                        "GesamtGewicht": m.group(7).replace(",", "."), "GesPreis": m.group(8).replace(",", ".")
-                    })
-            
-            ges_pattern = CONFIG["Goods"]["TotalPattern"]
-            ges_match = re.search(ges_pattern, text1)
-            if ges_match:
-                data["WarenGesamt"] = {
-                    "AnzArtikel": int(ges_match.group(1)), "MengeBestellt": int(ges_match.group(2)),
-                    "MengeGeliefert": int(ges_match.group(3)), "MengeErhalten": ges_match.group(4).replace(",", "."),
-                    "Differenz": ges_match.group(5).replace(",", "."), "GesamtGewicht": ges_match.group(6).replace(".", "").replace(",", "."),
-                    "GesPreis": ges_match.group(7).replace(",", ".").replace("€", "").strip()
-                }
-            
-            # --- ABSCHLUSS ---
-            # Annahmebereitschaft etc. ist sehr spezifisch, Keywords ggf. anpassen
-            annahme_block = re.search(r"(?is)Annahmebereitschaft([\s\S]*?)(?:Geliefert\s+an|Kommentar|Haftungsausschluss)", text1)
-            annahme_text = " ".join([l.strip() for l in annahme_block.group(1).split('\n') if l.strip() and "Annahmebereitschaft" not in l]) if annahme_block else ""
-            
-            komm = re.search(r"(?is)Haftungsausschluss\s+(.*?)(?:\n\s*\n|[a-z]{3,}\s*\d{2}\.\d{2}\.\d{2})", text1)
-            dt_pat_full = CONFIG["General"]["DateTimePattern"]
-            all_times = re.findall(rf"({dt_pat_full})", text1)
-            
-            data["Abschluss"] = {
-                "AnnahmeStatus": annahme_text,
-                "Kommentar": clean_spaces(komm.group(1)) if komm else "",
-                "FahrerSignatur": "",
-                "Zeitstempel": normalize_dt(all_times[-1][0]) if all_times else "" # group 0 weil nested regex
-            }
-            
-            # --- LEERGUT SEITE 2 ---
-            if len(pages_text) > 1:
-                text2 = pages_text[1]
-                lines2 = [clean_spaces(l) for l in text2.split("\n") if clean_spaces(l)]
-                
-                coll_pat = CONFIG["Empties"]["CollectionPattern"]
-                col_indices = {"Anlieferung": 1, "Abholung": 3, "Differenz": 4} if re.search(coll_pat, text2, re.IGNORECASE) else {"Anlieferung": 1, "Abholung": 2, "Differenz": 3}
-                
-                for line in lines2:
-                    m_gen = re.match(r"^\s*(\d{4})\s+(.*?)\s+(--|-?\d+)\s+(.*)", line)
-                    if m_gen:
-                        art_nr, name, saldo, rest = m_gen.group(1), clean_spaces(m_gen.group(2).replace("--", "")), m_gen.group(3).strip(), m_gen.group(4)
-                        nums = re.findall(r"(-?\d+)", rest)
-                        anl = nums[1] if len(nums) >= 2 else 0
-                        abh = nums[3] if len(nums) == 5 else (nums[2] if len(nums) == 4 else 0)
-                        diff = nums[4] if len(nums) == 5 else (nums[3] if len(nums) == 4 else 0)
-                        
-                        data["LeergutDetails"].append({
-                            "ArtikelNr": art_nr, "Bezeichnung": name, "Saldo": saldo, "Geplant": clean_int(nums[0]),
-                            "Anlieferung": clean_int(anl), "Abholung": clean_int(abh), "Differenz": clean_int(diff)
-                        })
-                
-                zus_pat = CONFIG["Empties"]["SummaryPattern"]
-                zus = re.search(zus_pat, text2)
-                best_kw = CONFIG["Conclusion"]["SignatureKeywords"]
-                best_pat = rf"(?is)Der\s+({'|'.join(best_kw)}).*?Unterschrift"
-                best = re.search(best_pat, text1)
-                
-                if zus:
-                    z_nums = re.findall(r"(-?\d+)", zus.group(1))
-                    if len(z_nums) >= 4:
-                        geplant, anl = clean_int(z_nums[0]), clean_int(z_nums[1])
-                        abh_idx, diff_idx = (3, 4) if len(z_nums) == 5 else (2, 3)
-                        abh, diff = clean_int(z_nums[abh_idx]), clean_int(z_nums[diff_idx])
-                        data["LeergutZusammenfassung"] = {"Geplant": geplant, "Anlieferung": anl, "Abholung": abh, "Differenz": diff}
-                        data["LeergutSummeSeite1"] = {"Anlieferung": anl, "Zurueck": abh, "Differenz": diff, "Bestaetigung": clean_spaces(best.group(0)) if best else ""}
-                
-                # Signatur Erkennung
-                sig_keywords = CONFIG["Conclusion"]["SignatureKeywords"]
-                sig_matches = []
-                for skw in sig_keywords:
-                    sig_matches.extend(list(re.finditer(rf"(?is){skw}", text1)))
-                
-                if sig_matches:
-                    # Sortieren nach Position um den letzten zu finden
-                    sig_matches.sort(key=lambda x: x.end())
-                    search_chunk = text1[sig_matches[-1].end():sig_matches[-1].end()+5000]
-                    ignore_sig = CONFIG["Conclusion"]["IgnoreSignatureContent"]
-                    
-                    for s_line in search_chunk.split('\n'):
-                        slc = clean_spaces(s_line)
-                        if not slc or any(ig in slc.lower() for ig in ignore_sig): continue
-                        if re.search(r"\d{2}\.\d{2}\.\d{2}", slc):
-                            found = re.sub(r"\d{2}\.\d{2}\.\d{2}.*", "", slc).strip()
-                            if len(found) > 2: data["Abschluss"]["FahrerSignatur"] = found; break
-                        elif re.match(r"^[A-Za-zÄÖÜäöüß\s]+$", slc) and len(slc) > 2: data["Abschluss"]["FahrerSignatur"] = slc; break
-            
-            if not data["LeergutSummeSeite1"]: data["LeergutSummeSeite1"] = {"Anlieferung": 0, "Zurueck": 0, "Differenz": 0, "Bestaetigung": clean_spaces(best.group(0)) if best else ""}
+        if pdf_bytes is None:
+            with open(path, "rb") as f: pdf_bytes = f.read()
+        if cache:
+            pdf_hash = cache.pdf_hash(pdf_bytes)
+            text_key = cache.text_key(pdf_hash, settings)
+            result_key = cache.result_key(text_key)
+            entry = cache.get_result(result_key)
+            texts = cache.get_text(text_key)
+            if texts: pages_text, rest_text, tables = texts["pages"], texts.get("rest"), texts.get("tables") or {}
+        if entry:
+            data.update({k: v for k, v in entry["result"].items() if k not in FILENAME_FIELDS})
+            cache_status = "hit"
+        else:
+            if pages_text is None:
+                pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+                pages_text = read_parsed_pages(pdf, opts, metrics, budget, tables)
+                if not any(t.strip() for t in pages_text) and len(pdf.pages) > PARSED_PAGES:
+                    # Vorne nur Scans: restliche Seiten pruefen, bevor das Dokument als leer gilt
+                    rest_text = read_remaining_pages(pdf, opts, metrics)
+                text_dirty = True
+            else:
+                cache_status = "text" # nur die Feld-Parser laufen neu
+            parse_text(data, pages_text, rest_text, plan, metrics.parsers if metrics else None, budget, tables)
+            cacheable = not budget.exceeded # Teilergebnisse nicht cachen (evtl. nur ein ueberlasteter Rechner)
+            text_dirty = text_dirty and not any(e["stage"].startswith("page") for e in budget.exceeded)
     except Exception as e: data["Error"] = str(e)
-    _save_and_output(data, json_path); save_csv(stem, data)
+    budget.apply(data)
+    if cache: data["_cache"] = {"status": cache_status, "key": result_key}
+    data["_config"] = config_info()
+    write = metrics.write if metrics else (lambda name, fn, *args: fn(*args))
+    emitted = False
+    try:
+        if "json" in sinks: write("json", save_json, data, json_path, writer)
+        txt = (pages_text is not None or entry) and opts["raw_text"] != "none" and "txt" in sinks
+        deferred = txt and rest_text is None and opts["raw_text"] == "deferred"
+        raw = lambda rest: "\n\n".join(t for t in (pages_text or []) + (rest or []) if t)
+        if txt:
+            raw_rest = rest_text
+            if pages_text is None: # Ergebnis aus dem Cache, Seitentexte nicht
+                try:
+                    if pdf is None: pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+                    pages_text = read_parsed_pages(pdf, opts, metrics, Budget(opts), tables)
+                    text_dirty = True
+                except Exception as e:
+                    raw_rest, deferred = [f"[Rohtext fehlgeschlagen: {e}]"], False
+            write("raw_text", save_raw_text, stem, raw(raw_rest), writer) # deferred: vorerst nur Seite 1-2
+        if "csv" in sinks: write("csv", save_csv, stem, data, writer)
+        if sinks & {"csv_append", "jsonl_append"}: write("append", save_appended, data, sinks, opts, writer)
+        if "sqlite" in sinks: write("sqlite", save_to_store, data, opts, writer)
+        if emit:
+            # Nach allen Ausgaben (Zeiten in _metrics), aber vor dem Layout der Restseiten: darauf wartet der Aufrufer nicht
+            emit_result(data, metrics, pages_text, rest_text)
+            emitted = True
+        if deferred:
+            try:
+                if pdf is None: pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+                rest_text = raw_rest = read_remaining_pages(pdf, opts, metrics)
+                text_dirty = True
+            except Exception as e:
+                raw_rest = [f"[Rohtext fehlgeschlagen: {e}]"]
+            write("raw_text_rest", save_raw_text, stem, raw(raw_rest), writer)
+        if cache:
+            if text_dirty and pages_text is not None: cache.put_text(text_key, pdf_hash, settings, filename, pages_text, rest_text, tables)
+            if cacheable: cache.put_result(result_key, text_key, data)
+    finally:
+        if pdf is not None: pdf.close()
+        if profiler:
+            profiler.disable()
+            profile_path = dump_profile(profiler, opts["profile_dir"], stem)
+            if metrics: metrics.profile = profile_path
+        if metrics:
+            # Nur in der Rueckgabe vollstaendig: stdout ist vor den Restseiten (deferred) geschrieben
+            data["_metrics"] = metrics.to_dict(pages_text, rest_text)
+        if emit and not emitted: emit_result(data)
+    return data
 
-def _save_and_output(data: dict, json_path: str):
-    with open(json_path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
-    print(json.dumps(data, ensure_ascii=False, indent=2))
+# --- REPARSE (Feld-Parser auf gecachten Seitentexten) ---
+def reparse_cached(options: dict = None, out=None) -> dict:
+    """Wendet die aktuelle Config auf alle Seitentexte im Cache an, ohne ein PDF zu oeffnen.
 
-if __name__ == "__main__":
-    if len(sys.argv) > 2:
-        # Erstes Argument: Pfad zur temp-PDF, Zweites: Original-Dateiname
-        process_pdf(sys.argv[1], sys.argv[2])
-    elif len(sys.argv) > 1:
-        process_pdf(sys.argv[1])
+    Gedacht fuer Config-Rollouts: pdfplumber-Layout entfaellt, es laufen nur die Regex-Parser.
+    Ergebnisse landen wie bei process_pdf in den gewaehlten Ausgaben und im Ergebnis-Cache.
+    """
+    load_config(force=True)
+    plan = get_plan()
+    opts = extraction_options(dict(options or {}, cache=True))
+    sinks = output_sinks(opts)
+    writer = get_output_writer(opts)
+    cache = get_cache(opts)
+    settings = text_settings(opts)
+    out = out or sys.stdout
+    summary = {"total": 0, "ok": 0, "with_error": 0}
+    started = time.monotonic()
+    for entry in cache.iter_texts():
+        if entry.get("settings") != settings: continue
+        t0 = time.perf_counter()
+        filename = entry.get("filename") or f"{entry['pdf_sha256']}.pdf"
+        stem = os.path.splitext(filename)[0]
+        data = new_result(filename)
+        budget = Budget(opts)
+        try: parse_text(data, entry["pages"], entry.get("rest"), plan, budget=budget, tables=entry.get("tables"))
+        except Exception as e: data["Error"] = str(e)
+        budget.apply(data)
+        data["_config"] = config_info()
+        if "json" in sinks: save_json(data, os.path.join(JSON_OUTPUT_DIR, f"{stem}.json"), writer)
+        if "csv" in sinks: save_csv(stem, data, writer)
+        if sinks & {"csv_append", "jsonl_append"}: save_appended(data, sinks, opts, writer)
+        if "sqlite" in sinks: save_to_store(data, opts, writer)
+        if not budget.exceeded: cache.put_result(cache.result_key(entry["key"]), entry["key"], data)
+        status = "error" if data.get("Error") else "ok"
+        summary["total"] += 1
+        summary["ok" if status == "ok" else "with_error"] += 1
+        out.write(json.dumps({"filename": filename, "pdf_sha256": entry["pdf_sha256"], "status": status,
+                              "seconds": round(time.perf_counter() - t0, 4), "result": data}, ensure_ascii=False) + "\n")
+    writer.flush()
+    wall = time.monotonic() - started
+    summary.update({"wall_seconds": round(wall, 3), "docs_per_sec": round(summary["total"] / wall, 2) if wall > 0 else 0.0,
+                    "config_hash": CONFIG_HASH})
+    print(f"Reparse fertig: {summary['total']} Dokumente, {summary['with_error']} mit Fehler, {summary['docs_per_sec']} Dok/s", file=sys.stderr)
+    return summary
+
+# --- WORKER-MODUS (langlaufender Prozess) ---
+# Protokoll: ein JSON-Objekt pro Zeile (NDJSON), Antwort ebenfalls als eine Zeile.
+#   {"id": 1, "cmd": "process", "path": "/tmp/x.pdf", "filename": "POD_...pdf"}
+#   {"id": 2, "cmd": "ping"}
+#   {"id": 3, "cmd": "shutdown"}
+# PDF ohne Temp-Datei: "length" statt "path", danach folgen genau so viele Bytes (Frame) auf dem Stream:
+#   {"id": 4, "cmd": "process", "filename": "POD_...pdf", "length": 48213}\n<48213 Bytes PDF>
+def handle_message(msg: dict, state: dict, pdf_bytes: bytes = None) -> dict:
+    """Verarbeitet eine Worker-Nachricht und liefert die Antwort (ohne stdout zu beschreiben)"""
+    msg_id = msg.get("id")
+    cmd = msg.get("cmd", "process")
+    if cmd == "ping":
+        return {"id": msg_id, "ok": True, "cmd": "pong", "pid": os.getpid(), "jobs": state["jobs"], "config": CONFIG_FILE,
+                "config_hash": CONFIG_HASH}
+    if cmd == "shutdown":
+        state["stop"] = True
+        flush_outputs()
+        return {"id": msg_id, "ok": True, "cmd": "shutdown", "jobs": state["jobs"]}
+    if cmd != "process":
+        return {"id": msg_id, "ok": False, "error": f"Unbekanntes Kommando: {cmd}"}
+    if not msg.get("path") and pdf_bytes is None:
+        return {"id": msg_id, "ok": False, "error": "Kein Pfad angegeben"}
+    try:
+        read_config()
+    except (FileNotFoundError, ValueError) as e:
+        return {"id": msg_id, "ok": False, "error": str(e)}
+    state["jobs"] += 1
+    options = dict(state.get("options") or {}, **(msg.get("options") or {}))
+    try:
+        result = process_pdf(msg.get("path"), msg.get("filename"), emit=False, options=options, pdf_bytes=pdf_bytes)
+    except Exception as e: # ungueltige Optionen, Schreibfehler der Ausgaben ...: ein Job darf den Worker nicht beenden
+        return {"id": msg_id, "ok": False, "error": str(e) or type(e).__name__}
+    return {"id": msg_id, "ok": True, "result": result}
+
+def read_frame(msg: dict, stream) -> bytes:
+    """Liest die laut msg["length"] angekuendigten PDF-Bytes vom (binaeren) Stream"""
+    if "length" not in msg: return None
+    length = msg["length"]
+    if not isinstance(length, int) or length < 0: raise ValueError(f"Ungueltige Laenge: {length!r}")
+    if stream is None: raise ValueError("Frames werden auf diesem Kanal nicht unterstuetzt")
+    data = stream.read(length)
+    if len(data) != length: raise ValueError(f"Frame unvollstaendig: {len(data)} von {length} Bytes")
+    return data
+
+def _handle_line(line: str, state: dict, stream=None) -> str:
+    line = line.strip()
+    if not line: return ""
+    try:
+        msg = json.loads(line)
+        if not isinstance(msg, dict): raise ValueError("Nachricht muss ein JSON-Objekt sein")
+        pdf_bytes = read_frame(msg, stream)
+    except ValueError as e:
+        return json.dumps({"id": None, "ok": False, "error": f"Ungueltige Nachricht: {e}"}, ensure_ascii=False)
+    return json.dumps(handle_message(msg, state, pdf_bytes), ensure_ascii=False)
+
+def serve_stdio(options: dict = None):
+    """Liest Jobs zeilenweise von stdin und schreibt je eine Antwortzeile nach stdout"""
+    state = {"jobs": 0, "stop": False, "options": options}
+    stdin = sys.stdin.buffer # binaer, damit auf eine Kopfzeile PDF-Bytes (Frame) folgen koennen
+    for raw in iter(stdin.readline, b""):
+        resp = _handle_line(raw.decode("utf-8", errors="replace"), state, stdin)
+        if resp:
+            sys.stdout.write(resp + "\n")
+            sys.stdout.flush()
+        if state["stop"]: break
+
+def serve_socket(socket_path: str, options: dict = None):
+    """Wie serve_stdio, aber ueber einen Unix-Socket (Verbindungen nacheinander)"""
+    import socketserver
+    if not hasattr(socketserver, "UnixStreamServer"):
+        print(json.dumps({"Error": "Unix-Sockets werden auf dieser Plattform nicht unterstuetzt"}))
+        sys.exit(1)
+    state = {"jobs": 0, "stop": False, "options": options}
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in iter(self.rfile.readline, b""):
+                resp = _handle_line(raw.decode("utf-8", errors="replace"), state, self.rfile)
+                if resp:
+                    self.wfile.write((resp + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                if state["stop"]: break
+
+    if os.path.exists(socket_path): os.unlink(socket_path)
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        try:
+            while not state["stop"]:
+                server.handle_request()
+        finally:
+            if os.path.exists(socket_path): os.unlink(socket_path)
+
+# --- BATCH-MODUS (Neu-Extraktion vieler PDFs, z.B. nach Config-Aenderung) ---
+def iter_batch_inputs(source: str):
+    """Liefert (Pfad, Dateiname, Fehler) aus einem Verzeichnis (rekursiv, *.pdf) oder einer Manifest-Datei.
+
+    Manifest: eine Zeile pro PDF, entweder "pfad[;original_dateiname]" oder {"path": ..., "filename": ...}.
+    Eine kaputte Zeile bricht den Batch nicht ab: sie kommt als "manifest:zeile" mit Fehlertext.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"): yield os.path.join(root, name), None, None
+        return
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8-sig") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"): continue
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                    path, name = entry.get("path"), entry.get("filename")
+                    if not isinstance(path, str) or not path.strip(): raise ValueError("kein path angegeben")
+                except ValueError as e: # auch json.JSONDecodeError
+                    yield f"{source}:{lineno}", None, f"Ungueltige Manifest-Zeile: {e}"
+                    continue
+            else:
+                path, _, name = line.partition(";")
+            path = path.strip()
+            if not os.path.isabs(path): path = os.path.join(base, path)
+            yield path, (name or "").strip() or None, None
+
+def _batch_worker(conn, options: dict):
+    """Worker-Prozess: verarbeitet Jobs aus der Pipe, bis None kommt.
+
+    Job: (pfad, dateiname) im Batch-Modus, beim Job-Server (pfad, dateiname, optionen, pdf_bytes).
+    """
+    while True:
+        job = conn.recv()
+        if job is None: break
+        path, name = job[0], job[1]
+        job_options, pdf_bytes = (job[2], job[3]) if len(job) > 2 else (None, None)
+        started = time.perf_counter()
+        try:
+            result = process_pdf(path, name, emit=False, options=dict(options, **(job_options or {})), pdf_bytes=pdf_bytes)
+            flush_outputs() # "ok" erst melden, wenn die Dateien geschrieben sind
+            conn.send({"ok": True, "result": result, "seconds": time.perf_counter() - started})
+        except BaseException as e: # auch SystemExit aus load_config
+            conn.send({"ok": False, "error": str(e) or type(e).__name__, "seconds": time.perf_counter() - started})
+
+def spawn_worker(ctx, options: dict) -> dict:
+    """Startet einen Worker-Prozess mit eigener Pipe (Batch-Modus und Job-Server)"""
+    parent, child = ctx.Pipe()
+    proc = ctx.Process(target=_batch_worker, args=(child, options), daemon=True)
+    proc.start()
+    child.close()
+    return {"proc": proc, "conn": parent, "job": None, "started": 0.0}
+
+def kill_worker(slot: dict):
+    slot["proc"].kill()
+    slot["proc"].join()
+    slot["conn"].close()
+
+def stop_workers(slots: list):
+    """Worker regulaer beenden (None), haengende nach 5 Sekunden abschiessen"""
+    for slot in slots:
+        try: slot["conn"].send(None)
+        except (OSError, ValueError): pass
+    for slot in slots:
+        slot["proc"].join(5)
+        if slot["proc"].is_alive(): slot["proc"].kill()
+
+class BatchRunner:
+    """Verteilt PDFs auf einen Pool von Worker-Prozessen.
+
+    Jeder Worker hat eine eigene Pipe: haengt ein Dokument laenger als timeout oder stuerzt der
+    Prozess ab, wird nur dieser Worker ersetzt und das Dokument als fehlgeschlagen gezaehlt.
+    """
+
+    def __init__(self, workers: int = None, timeout: float = 60.0, options: dict = None, out=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.options = dict(options or {})
+        # Sammeldateien (csv_append/jsonl_append) pro Batch statt pro Tag
+        if not self.options.get("output_group"): self.options["output_group"] = f"batch_{datetime.now():%Y%m%d_%H%M%S}"
+        self.out = out or sys.stdout
+        self.ctx = multiprocessing.get_context()
+        self.summary = {"total": 0, "ok": 0, "with_error": 0, "failed": 0, "timeouts": 0, "files": []}
+
+    def _spawn(self) -> dict:
+        return spawn_worker(self.ctx, self.options)
+
+    def _assign(self, slot: dict, jobs) -> bool:
+        for path, name, error in jobs:
+            if error: # kaputte Manifest-Zeile: wie ein nicht lesbares PDF als fehlgeschlagen melden
+                self._record((path, name), "failed", 0.0, error=error)
+                continue
+            slot["job"], slot["started"] = (path, name), time.monotonic()
+            slot["conn"].send(slot["job"])
+            return True
+        slot["job"] = None
+        return False
+
+    def _replace(self, slot: dict):
+        kill_worker(slot)
+        slot.update(self._spawn())
+
+    def _record(self, job, status: str, seconds: float, result: dict = None, error: str = ""):
+        path, name = job
+        line = {"path": path, "filename": name or os.path.basename(path), "status": status, "seconds": round(seconds, 3)}
+        if result is not None: line["result"] = result
+        if error: line["error"] = error
+        self.out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.out.flush()
+        self.summary["total"] += 1
+        self.summary[{"ok": "ok", "error": "with_error", "timeout": "timeouts"}.get(status, "failed")] += 1
+        entry = {"path": path, "status": status, "seconds": line["seconds"]}
+        if error: entry["error"] = error
+        self.summary["files"].append(entry)
+
+    def run(self, source: str) -> dict:
+        started = time.monotonic()
+        jobs = iter_batch_inputs(source)
+        slots = [self._spawn() for _ in range(self.workers)]
+        try:
+            for slot in slots: self._assign(slot, jobs)
+            while True:
+                busy = [s for s in slots if s["job"] is not None]
+                if not busy: break
+                deadline = min(s["started"] for s in busy) + self.timeout
+                wait_connections([s["conn"] for s in busy] + [s["proc"].sentinel for s in busy],
+                                 timeout=max(0.0, deadline - time.monotonic()))
+                for slot in busy:
+                    job, elapsed = slot["job"], time.monotonic() - slot["started"]
+                    if slot["conn"].poll():
+                        try:
+                            msg = slot["conn"].recv()
+                        except EOFError:
+                            self._record(job, "failed", elapsed, error="Worker beendet")
+                            self._replace(slot)
+                        else:
+                            if not msg["ok"]: self._record(job, "failed", msg["seconds"], error=msg["error"])
+                            else:
+                                result = msg["result"]
+                                self._record(job, "error" if result.get("Error") else "ok", msg["seconds"], result, result.get("Error", ""))
+                    elif not slot["proc"].is_alive():
+                        self._record(job, "failed", elapsed, error=f"Worker abgestuerzt (Exitcode {slot['proc'].exitcode})")
+                        self._replace(slot)
+                    elif elapsed > self.timeout:
+                        self._record(job, "timeout", elapsed, error=f"Timeout nach {self.timeout:g} Sekunden")
+                        self._replace(slot)
+                    else:
+                        continue
+                    self._assign(slot, jobs)
+        finally:
+            stop_workers(slots)
+        wall = time.monotonic() - started
+        times = sorted(f["seconds"] for f in self.summary["files"])
+        self.summary.update({
+            "source": source, "workers": self.workers, "wall_seconds": round(wall, 3),
+            "docs_per_sec": round(self.summary["total"] / wall, 2) if wall > 0 else 0.0,
+            "median_seconds": times[len(times) // 2] if times else 0.0, "max_seconds": times[-1] if times else 0.0,
+            "config": CONFIG_FILE,
+        })
+        return self.summary
+
+def run_batch(source: str, workers: int = None, timeout: float = 60.0, options: dict = None, summary_path: str = None) -> dict:
+    summary = BatchRunner(workers, timeout, options).run(source)
+    if not summary_path:
+        summary_path = os.path.join(os.path.dirname(JSON_OUTPUT_DIR), f"batch_summary_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f: json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"Batch fertig: {summary['total']} Dokumente, {summary['failed']} fehlgeschlagen, {summary['timeouts']} Timeouts, "
+          f"{summary['docs_per_sec']} Dok/s -> {summary_path}", file=sys.stderr)
+    return summary
+
+# --- JOB-SERVER (asyncio: begrenzte Warteschlange, Worker-Pool, Prioritaeten) ---
+# Protokoll wie --serve (NDJSON, optional mit Frame), aber beliebig viele Jobs gleichzeitig pro Verbindung:
+#   {"id": 1, "cmd": "process", "path": "...", "priority": "interactive"} -> sofort {"id": 1, "ok": true, "cmd": "queued", "job": "j1", ...}
+#                                                                         -> spaeter {"id": 1, "ok": true, "job": "j1", "result": {...}}
+#   Warteschlange voll -> {"id": 1, "ok": false, "busy": true, "queue_depth": ...}; mit "wait": true wird stattdessen gewartet
+#   {"id": 2, "cmd": "cancel", "job": "j1"} -> wartender Job entfaellt, laufender Worker wird ersetzt
+#   {"id": 3, "cmd": "stats"}               -> Warteschlange, laufende Jobs, Zaehler und Latenzen (p50/p95/max in ms)
+JOB_PRIORITIES = {"interactive": 0, "bulk": 1} # kleiner = frueher
+LATENCY_WINDOW = 1000 # Latenzen der letzten N Jobs fuer stats
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+class Job:
+    def __init__(self, job_id: str, msg: dict, pdf_bytes: bytes, reply):
+        self.id = job_id
+        self.msg_id = msg.get("id")
+        self.priority = msg.get("priority", "bulk")
+        self.path, self.filename = msg.get("path"), msg.get("filename")
+        self.options = msg.get("options") or {}
+        self.pdf_bytes = pdf_bytes
+        self.reply = reply # async, schreibt eine Antwortzeile auf die Verbindung des Auftraggebers
+        self.state = "queued" # queued -> running -> (Ende) oder cancelled
+        self.slot = None
+        self.submitted = time.monotonic()
+        self.started = 0.0
+
+class JobServer:
+    """asyncio-Front-End vor einem Pool von Extraktions-Prozessen.
+
+    Die Warteschlange ist begrenzt (queue_size): ist sie voll, antwortet der Server sofort mit "busy",
+    statt PDFs im Speicher zu stauen. Interaktive Jobs werden vor dem Bulk-Rueckstand verteilt.
+    Die Worker sind dieselben Prozesse wie im Batch-Modus; ein Timeout oder ein abgebrochener
+    laufender Job kostet nur diesen einen Worker, der sofort ersetzt wird.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = 100, timeout: float = 60.0, options: dict = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_size = max(1, queue_size)
+        self.timeout = timeout
+        self.options = dict(options or {})
+        # Ersatz-Worker entstehen, waehrend Executor-Threads in recv haengen: fork waere dann unsicher
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.ctx = multiprocessing.get_context(method)
+        if method == "forkserver": self.ctx.set_forkserver_preload(["__main__"]) # pdfplumber nur einmal importieren
+        self.jobs = {} # Job-ID -> Job (wartend oder laufend)
+        self.queued = {prio: 0 for prio in JOB_PRIORITIES.values()}
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0, "timeouts": 0}
+        self.latencies = {kind: deque(maxlen=LATENCY_WINDOW) for kind in ("queue", "run", "total")}
+        self._seq = 0
+        self.started = time.monotonic()
+        self.queue = self.space = self.stopping = self.executor = None # erst in der Event-Loop anlegen
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def queue_depth(self) -> int:
+        return sum(self.queued.values())
+
+    def stats(self) -> dict:
+        names = {prio: name for name, prio in JOB_PRIORITIES.items()}
+        latency = {}
+        for kind, values in self.latencies.items():
+            if not values: continue
+            ordered = sorted(values)
+            latency[kind] = {"p50": round(_percentile(ordered, 0.5) * 1000, 1), "p95": round(_percentile(ordered, 0.95) * 1000, 1),
+                             "max": round(ordered[-1] * 1000, 1)}
+        return {"queue_depth": self.queue_depth(), "queued": {names[prio]: n for prio, n in self.queued.items()},
+                "in_flight": sum(1 for job in self.jobs.values() if job.state == "running"), "workers": self.workers,
+                "queue_size": self.queue_size, **self.counters, "latency_ms": latency,
+                "uptime_seconds": round(time.monotonic() - self.started, 1), "config_hash": CONFIG_HASH}
+
+    async def _freed(self):
+        async with self.space: self.space.notify_all()
+
+    async def submit(self, msg: dict, pdf_bytes: bytes, reply):
+        msg_id = msg.get("id")
+        if not msg.get("path") and pdf_bytes is None:
+            return await reply({"id": msg_id, "ok": False, "error": "Kein Pfad angegeben"})
+        if msg.get("priority", "bulk") not in JOB_PRIORITIES:
+            return await reply({"id": msg_id, "ok": False, "error": f"Unbekannte Prioritaet: {msg.get('priority')}"})
+        job_id = str(msg.get("job") or f"j{self.counters['submitted'] + 1}")
+        if job_id in self.jobs:
+            return await reply({"id": msg_id, "ok": False, "error": f"Job {job_id} laeuft bereits"})
+        if self.queue_depth() >= self.queue_size:
+            if not msg.get("wait"):
+                self.counters["rejected"] += 1
+                return await reply({"id": msg_id, "ok": False, "busy": True, "error": "Warteschlange voll",
+                                    "queue_depth": self.queue_depth(), "queue_size": self.queue_size})
+            # Backpressure: diese Verbindung liest erst weiter, wenn wieder Platz ist
+            async with self.space: await self.space.wait_for(lambda: self.queue_depth() < self.queue_size or self.stopping.is_set())
+            if self.stopping.is_set():
+                return await reply({"id": msg_id, "ok": False, "error": "Server wird beendet"})
+        job = Job(job_id, msg, pdf_bytes, reply)
+        prio = JOB_PRIORITIES[job.priority]
+        self.jobs[job.id] = job
+        self.queued[prio] += 1
+        self.counters["submitted"] += 1
+        self.queue.put_nowait((prio, self._next_seq(), job))
+        await reply({"id": msg_id, "ok": True, "cmd": "queued", "job": job.id, "priority": job.priority,
+                     "queue_depth": self.queue_depth()})
+
+    async def cancel(self, job_id: str) -> str:
+        """Bricht einen Job ab; liefert den Zustand vor dem Abbruch (queued/running) oder None"""
+        job = self.jobs.get(job_id)
+        if job is None or job.state == "cancelled": return None
+        state, job.state = job.state, "cancelled"
+        if state == "queued": # bleibt als Leiche in der PriorityQueue, der Worker ueberspringt ihn
+            self.queued[JOB_PRIORITIES[job.priority]] -= 1
+            del self.jobs[job.id]
+            self.counters["cancelled"] += 1
+            await self._freed()
+            await job.reply({"id": job.msg_id, "ok": False, "job": job.id, "cancelled": True, "error": "Abgebrochen"})
+        else:
+            job.slot["proc"].kill() # recv im Worker-Task endet mit EOFError, dort wird geantwortet und ersetzt
+        return state
+
+    async def _run_worker(self, slot: dict):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self.queue.get()
+            if job is None: break
+            if job.state == "cancelled": continue
+            self.queued[JOB_PRIORITIES[job.priority]] -= 1
+            await self._freed()
+            job.state, job.slot, job.started = "running", slot, time.monotonic()
+            resp = {"id": job.msg_id, "job": job.id}
+            msg = error = None
+            timeout = False
+            try:
+                conn = slot["conn"]
+                await loop.run_in_executor(self.executor, conn.send, (job.path, job.filename, job.options, job.pdf_bytes))
+                msg = await asyncio.wait_for(loop.run_in_executor(self.executor, conn.recv), self.timeout)
+            except asyncio.TimeoutError:
+                timeout, error = True, f"Timeout nach {self.timeout:g} Sekunden"
+            except (EOFError, OSError) as e:
+                error = f"Worker beendet: {e or type(e).__name__}"
+            # cancel() toetet den Prozess auch dann, wenn das Ergebnis schon in der Pipe lag
+            replace = msg is None or job.state == "cancelled"
+            if job.state == "cancelled":
+                self.counters["cancelled"] += 1
+                resp.update(ok=False, cancelled=True, error="Abgebrochen")
+            elif msg is None:
+                self.counters["timeouts" if timeout else "failed"] += 1
+                resp.update(ok=False, error=error)
+                if timeout: resp["timeout"] = True
+            else:
+                self.counters["completed" if msg["ok"] else "failed"] += 1
+                resp.update(ok=msg["ok"], seconds=round(msg["seconds"], 3))
+                if msg["ok"]: resp["result"] = msg["result"]
+                else: resp["error"] = msg["error"]
+            done = time.monotonic()
+            if not resp.get("cancelled"):
+                self.latencies["queue"].append(job.started - job.submitted)
+                self.latencies["run"].append(done - job.started)
+                self.latencies["total"].append(done - job.submitted)
+            self.jobs.pop(job.id, None)
+            if replace:
+                await loop.run_in_executor(self.executor, kill_worker, slot)
+                slot.update(spawn_worker(self.ctx, self.options))
+            await job.reply(resp)
+
+    async def _read_frame(self, msg: dict, reader) -> bytes:
+        if "length" not in msg: return None
+        length = msg["length"]
+        if not isinstance(length, int) or length < 0: raise ValueError(f"Ungueltige Laenge: {length!r}")
+        try:
+            return await reader.readexactly(length)
+        except asyncio.IncompleteReadError as e:
+            raise ValueError(f"Frame unvollstaendig: {len(e.partial)} von {length} Bytes")
+
+    async def handle(self, msg: dict, pdf_bytes: bytes, reply):
+        msg_id = msg.get("id")
+        cmd = msg.get("cmd", "process")
+        if cmd == "process":
+            await self.submit(msg, pdf_bytes, reply)
+        elif cmd == "cancel":
+            state = await self.cancel(str(msg.get("job")))
+            if state: await reply({"id": msg_id, "ok": True, "cmd": "cancel", "job": msg.get("job"), "state": state})
+            else: await reply({"id": msg_id, "ok": False, "error": f"Unbekannter Job: {msg.get('job')}"})
+        elif cmd == "stats":
+            await reply({"id": msg_id, "ok": True, "cmd": "stats", **self.stats()})
+        elif cmd == "ping":
+            await reply({"id": msg_id, "ok": True, "cmd": "pong", "pid": os.getpid(), "jobs": self.counters["submitted"],
+                         "config": CONFIG_FILE, "config_hash": CONFIG_HASH})
+        elif cmd == "shutdown":
+            await reply({"id": msg_id, "ok": True, "cmd": "shutdown", "jobs": self.counters["submitted"]})
+            self.stopping.set()
+        else:
+            await reply({"id": msg_id, "ok": False, "error": f"Unbekanntes Kommando: {cmd}"})
+
+    async def _connection(self, reader, writer):
+        lock = asyncio.Lock() # Antworten verschiedener Jobs nicht ineinander schreiben
+
+        async def reply(resp: dict):
+            async with lock:
+                if writer.is_closing(): return # Auftraggeber weg: Job laeuft trotzdem zu Ende (Ausgaben)
+                writer.write((json.dumps(resp, ensure_ascii=False) + "\n").encode("utf-8"))
+                try: await writer.drain()
+                except (ConnectionError, OSError): pass
+
+        try:
+            while not self.stopping.is_set():
+                raw = await reader.readline()
+                if not raw: break
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line: continue
+                try:
+                    msg = json.loads(line)
+                    if not isinstance(msg, dict): raise ValueError("Nachricht muss ein JSON-Objekt sein")
+                    pdf_bytes = await self._read_frame(msg, reader)
+                except ValueError as e:
+                    await reply({"id": None, "ok": False, "error": f"Ungueltige Nachricht: {e}"})
+                    continue
+                await self.handle(msg, pdf_bytes, reply)
+                # readline liefert gepufferte Zeilen ohne abzugeben; freie Worker sollen den Job
+                # uebernehmen, bevor die naechste Zeile die Warteschlange als voll sieht
+                await asyncio.sleep(0)
+        except (ConnectionError, ValueError): # ValueError: Zeile laenger als das Stream-Limit
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = None, port: int = None):
+        self.queue, self.space, self.stopping = asyncio.PriorityQueue(), asyncio.Condition(), asyncio.Event()
+        slots = [spawn_worker(self.ctx, self.options) for _ in range(self.workers)] # vor den Executor-Threads forken
+        self.executor = ThreadPoolExecutor(max_workers=2 * self.workers)
+        tasks = [asyncio.create_task(self._run_worker(slot)) for slot in slots]
+        if socket_path:
+            if os.path.exists(socket_path): os.remove(socket_path)
+            server = await asyncio.start_unix_server(self._connection, path=socket_path)
+        else:
+            server = await asyncio.start_server(self._connection, host="127.0.0.1", port=port)
+            socket_path = None
+        endpoint = socket_path or "127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+        print(f"Job-Server bereit: {endpoint}, {self.workers} Worker, Warteschlange {self.queue_size}", file=sys.stderr, flush=True)
+        try:
+            await self.stopping.wait()
+        finally:
+            server.close()
+            for job in [job for job in self.jobs.values() if job.state == "queued"]: await self.cancel(job.id)
+            async with self.space: self.space.notify_all() # wartende Einreicher (wait) freigeben
+            for _ in tasks: self.queue.put_nowait((len(JOB_PRIORITIES), self._next_seq(), None)) # nach laufenden Jobs
+            await asyncio.gather(*tasks)
+            stop_workers(slots)
+            self.executor.shutdown(wait=False)
+            if socket_path and os.path.exists(socket_path): os.remove(socket_path)
+
+def serve_jobs(socket_path: str = None, port: int = None, workers: int = None, queue_size: int = 100,
+               timeout: float = 60.0, options: dict = None):
+    """Startet den Job-Server auf einem Unix-Socket oder (z.B. unter Windows) auf 127.0.0.1:port"""
+    if socket_path and not hasattr(asyncio, "start_unix_server"):
+        print(json.dumps({"Error": "Unix-Sockets werden auf dieser Plattform nicht unterstuetzt, --port verwenden"}))
+        sys.exit(1)
+    asyncio.run(JobServer(workers, queue_size, timeout, options).serve(socket_path, port))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="POD-Extraktion mit pdfplumber")
+    parser.add_argument("pdf", nargs="?", help="Pfad zur PDF-Datei oder - fuer PDF-Bytes ueber stdin")
+    parser.add_argument("filename", nargs="?", help="Original-Dateiname")
+    parser.add_argument("--serve", action="store_true", help="Worker-Modus: NDJSON-Jobs ueber stdin/stdout")
+    parser.add_argument("--socket", help="Worker-Modus ueber einen Unix-Socket unter diesem Pfad")
+    parser.add_argument("--batch", metavar="QUELLE", help="Verzeichnis oder Manifest-Datei mit PDFs parallel verarbeiten")
+    parser.add_argument("--job-server", action="store_true", help="Job-Server mit Warteschlange und Worker-Pool (ueber --socket oder --port)")
+    parser.add_argument("--port", type=int, help="TCP-Port des Job-Servers auf 127.0.0.1 (statt --socket)")
+    parser.add_argument("--queue-size", type=int, default=100, help="Max. wartende Jobs im Job-Server, danach busy")
+    parser.add_argument("--workers", type=int, help="Anzahl Worker-Prozesse im Batch-Modus und Job-Server (Standard: CPU-Kerne)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Sekunden pro Dokument im Batch-Modus und Job-Server")
+    parser.add_argument("--summary", help="Pfad fuer die Batch-Zusammenfassung (JSON)")
+    parser.add_argument("--raw-text", choices=["parsed", "deferred", "none"], help="Inhalt der Rohtext-Datei (Standard: parsed)")
+    parser.add_argument("--raw-time-budget", type=float, help="Sekunden fuer Rohtext der restlichen Seiten")
+    parser.add_argument("--page-char-limit", type=int, help="Max. Zeichenobjekte pro Seite")
+    parser.add_argument("--engine", choices=["layout", "lines"], help="Text-Engine: layout (Standard) oder lines (Zeilen direkt aus den Zeichen, schneller)")
+    parser.add_argument("--tables", action="store_true", help="Waren/Leergut aus der Tabellengeometrie lesen (Regex als Fallback)")
+    parser.add_argument("--page-time-budget", type=float, help="Sekunden pro Seite fuer die Textextraktion (0 = ohne Limit)")
+    parser.add_argument("--regex-time-budget", type=float, help="Sekunden pro Parser-Stufe (0 = ohne Limit)")
+    parser.add_argument("--reparse-cache", action="store_true", help="Alle gecachten Seitentexte mit der aktuellen Config neu parsen")
+    parser.add_argument("--no-cache", action="store_true", help="Cache nicht verwenden")
+    parser.add_argument("--cache-dir", help="Verzeichnis fuer den Ergebnis-Cache")
+    parser.add_argument("--metrics", action="store_true", help="_metrics-Abschnitt mit Zeiten pro Seite, Parser und Ausgabe")
+    parser.add_argument("--profile-dir", help="cProfile-Dump pro Dokument in dieses Verzeichnis schreiben")
+    parser.add_argument("--outputs", help=f"Ausgaben, kommagetrennt ({', '.join(OUTPUT_SINKS)}) oder none; Standard: json,txt,csv")
+    parser.add_argument("--output-group", help="Name der Sammeldateien output/pod_<gruppe>.csv/.jsonl (Standard: Tagesdatum)")
+    parser.add_argument("--async-output", action="store_true", help="Ausgabedateien in einem Hintergrund-Thread schreiben")
+    parser.add_argument("--store-path", help="Ergebnis-Datenbank der Ausgabe sqlite (Standard: output/pod_results.sqlite)")
+    parser.add_argument("--store-import", metavar="VERZEICHNIS", help="Bestehende JSON-Ergebnisse in die Ergebnis-Datenbank uebernehmen")
+    parser.add_argument("--store-query", action="store_true", help="Ergebnisse aus der Datenbank abfragen (Filter: --mandant/--filiale/--tour/--from/--to)")
+    parser.add_argument("--mandant", help="Filter fuer --store-query")
+    parser.add_argument("--filiale", help="Filter fuer --store-query")
+    parser.add_argument("--tour", help="Filter fuer --store-query")
+    parser.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD", help="Erster Liefertag fuer --store-query")
+    parser.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD", help="Letzter Liefertag fuer --store-query")
+    parser.add_argument("--columns", help="Spalten fuer --store-query, kommagetrennt (Standard: alle CSV-Spalten)")
+    parser.add_argument("--export", metavar="DATEI", help="Abfrage als .csv oder .jsonl (komplette Ergebnisse) speichern statt auf stdout")
+    args = parser.parse_args(argv)
+    options = {"raw_text": args.raw_text, "raw_time_budget": args.raw_time_budget, "page_char_limit": args.page_char_limit,
+               "page_time_budget": args.page_time_budget, "regex_time_budget": args.regex_time_budget, "engine": args.engine,
+               "tables": True if args.tables else None,
+               "cache": False if args.no_cache else None, "cache_dir": args.cache_dir,
+               "metrics": True if args.metrics else None, "profile_dir": args.profile_dir,
+               "outputs": args.outputs, "output_group": args.output_group, "async_output": True if args.async_output else None,
+               "store_path": args.store_path}
+
+    if args.store_import or args.store_query:
+        store = get_result_store(extraction_options(options))
+        try:
+            if args.store_import:
+                count = import_json_results(args.store_import, store)
+                print(f"Import fertig: {count} Ergebnisse -> {store.path}", file=sys.stderr)
+            else:
+                columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
+                if args.export and args.export.lower().endswith(".jsonl"): columns = ["Json"]
+                rows = store.query(dict(zip(STORE_FILTERS, (args.mandant, args.filiale, args.tour))), args.date_from, args.date_to, columns)
+                count = export_rows(rows, args.export)
+                if args.export: print(f"Export fertig: {count} Zeilen -> {args.export}", file=sys.stderr)
+        except ValueError as e:
+            print(f"Fehler: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.reparse_cache:
+        reparse_cached(options)
+    elif args.batch:
+        load_config()
+        run_batch(args.batch, args.workers, args.timeout, options, args.summary)
+    elif args.job_server:
+        if not args.socket and args.port is None: parser.error("--job-server braucht --socket oder --port")
+        load_config()
+        try:
+            serve_jobs(args.socket, args.port, args.workers, args.queue_size, args.timeout, options)
+        except KeyboardInterrupt:
+            pass
+    elif args.serve or args.socket:
+        load_config() # einmal beim Start laden, danach nur bei Aenderung der Datei
+        try:
+            if args.socket: serve_socket(args.socket, options)
+            else: serve_stdio(options)
+        except KeyboardInterrupt:
+            pass
+    elif args.pdf:
+        # Erstes Argument: Pfad zur temp-PDF (oder - fuer stdin), Zweites: Original-Dateiname
+        if args.pdf == "-":
+            process_pdf(None, args.filename, options=options, pdf_bytes=sys.stdin.buffer.read())
+        else:
+            process_pdf(args.pdf, args.filename, options=options)
     else:
-        print(json.dumps({"Error": "Kein Pfad angegeben"}, ensure_ascii=False))
\ No newline at end of file
+        print(json.dumps({"Error": "Kein Pfad angegeben"}, ensure_ascii=False))
+
+if __name__ == "__main__":
+    configure_stdio()
+    main()
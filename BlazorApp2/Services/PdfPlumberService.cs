@@ -16,6 +16,7 @@ public class PdfPlumberService : IPdfPlumberService
     private readonly string _scriptPath;
     private readonly string _tempDir;
     private readonly string _configPath;
+    private readonly bool _useStdin;
 
     public PdfPlumberService(IConfiguration configuration, ILogger<PdfPlumberService> logger)
     {
@@ -38,6 +39,9 @@ public class PdfPlumberService : IPdfPlumberService
         
         _tempDir = configuration["PdfPlumber:TempDir"] ?? Path.GetTempPath();
         
+        // "stdin" (default): PDF bytes are piped to the script, no temp file; "file": legacy temp file
+        _useStdin = !string.Equals(configuration["PdfPlumber:InputMode"], "file", StringComparison.OrdinalIgnoreCase);
+        
         // OCR Config path - same logic as OcrConfigService
         _configPath = Environment.GetEnvironmentVariable("OCR_CONFIG_PATH") ?? 
                       Path.Combine(AppDomain.CurrentDomain.BaseDirectory, "Config", "ocr_config.json");
@@ -52,14 +56,18 @@ public class PdfPlumberService : IPdfPlumberService
         
         try
         {
-            // Save PDF to temp file
-            tempPdfPath = Path.Combine(_tempDir, $"temp_{Guid.NewGuid():N}.pdf");
-            await File.WriteAllBytesAsync(tempPdfPath, pdfContent);
-            
-            _logger.LogInformation("Processing PDF: {FileName}, TempPath: {TempPath}", fileName, tempPdfPath);
-
-
-
+            if (_useStdin)
+            {
+                _logger.LogInformation("Processing PDF: {FileName} via stdin ({Bytes} bytes)", fileName, pdfContent.Length);
+            }
+            else
+            {
+                // Save PDF to temp file
+                tempPdfPath = Path.Combine(_tempDir, $"temp_{Guid.NewGuid():N}.pdf");
+                await File.WriteAllBytesAsync(tempPdfPath, pdfContent);
+                
+                _logger.LogInformation("Processing PDF: {FileName}, TempPath: {TempPath}", fileName, tempPdfPath);
+            }
 
             // Check if script exists
             if (!File.Exists(_scriptPath))
@@ -70,12 +78,13 @@ public class PdfPlumberService : IPdfPlumberService
                 return result;
             }
 
-            // Run Python script - pass original filename as second argument
+            // Run Python script - pass original filename as second argument ("-" = read PDF from stdin)
             var startInfo = new ProcessStartInfo
             {
                 FileName = _pythonPath,
-                Arguments = $"\"{_scriptPath}\" \"{tempPdfPath}\" \"{fileName}\"",
+                Arguments = $"\"{_scriptPath}\" \"{tempPdfPath ?? "-"}\" \"{fileName}\"",
                 UseShellExecute = false,
+                RedirectStandardInput = _useStdin,
                 RedirectStandardOutput = true,
                 RedirectStandardError = true,
                 CreateNoWindow = true,
@@ -91,15 +100,39 @@ public class PdfPlumberService : IPdfPlumberService
             using var process = new Process { StartInfo = startInfo };
             process.Start();
 
+            // 60 seconds for everything, including writing the PDF to stdin: if the script stalls
+            // before reading it, the write would block forever once the pipe buffer is full
+            using var timeout = new CancellationTokenSource(TimeSpan.FromSeconds(60));
+            using var killOnTimeout = timeout.Token.Register(() =>
+            {
+                try { process.Kill(true); } catch (InvalidOperationException) { } // already exited
+            });
+
             var outputTask = process.StandardOutput.ReadToEndAsync();
             var errorTask = process.StandardError.ReadToEndAsync();
-            
-            // Wait with timeout
-            var completed = process.WaitForExit(60000); // 60 seconds timeout
-            
+
+            var completed = true;
+            try
+            {
+                if (_useStdin)
+                {
+                    // Closing stdin signals the end of the PDF to the script
+                    await using (var stdin = process.StandardInput.BaseStream)
+                    {
+                        await stdin.WriteAsync(pdfContent, timeout.Token);
+                    }
+                }
+
+                await process.WaitForExitAsync(timeout.Token);
+            }
+            catch (Exception ex) when (timeout.IsCancellationRequested && ex is OperationCanceledException or IOException)
+            {
+                // IOException: the killed script closed the pipe while the PDF was still being written
+                completed = false;
+            }
+
             if (!completed)
             {
-                process.Kill();
                 result.Error = "Python script timeout after 60 seconds";
                 result.RawJson = CreateDefaultJson(fileName);
                 return result;